@@ -1,182 +1,473 @@
 import pandas as pd
 import numpy as np
 import logging
+import hashlib
+import multiprocessing
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass, fields
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Any, ClassVar, Union
 import talib  # Ensure you have TA-Lib installed
 from sklearn.preprocessing import StandardScaler, MinMaxScaler # Import for scaling
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError: # pyarrow is optional; fall back to the pandas C parser
+    pa = None
+from ._kernels import _rolling_sma, _returns_and_vol, _ffill_bfill, warmup
+
+warmup() # Prime the JIT so the first load_ticker isn't billed the compile
+
+def _setup_logger() -> logging.Logger:
+    logger = logging.getLogger('DataLoader')
+    # Configure only once, so later DataLoaders neither build throwaway handlers nor reset a level the user changed
+    if not logger.handlers:
+        ch = logging.StreamHandler()
+        ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(ch)
+        logger.setLevel(logging.INFO)
+    return logger
+
+logger = _setup_logger() # Shared by every DataLoader rather than looked up per instance
+
+# OHLC prices fit comfortably in float32 (7 significant digits); volume is a share count
+PRICE_DTYPES = {'open': 'float32', 'high': 'float32', 'low': 'float32', 'close': 'float32'}
+
+FEATURE_VERSION = '2' # Bump whenever get_features changes so stale Parquet caches are ignored
+
+_TA_CACHE: 'OrderedDict[tuple, Any]' = OrderedDict() # LRU of TA-Lib results shared across tickers and loaders
+_TA_CACHE_SIZE = 32
+
+def _cached_ta(close: np.ndarray, fn, **params):
+    """
+    Memoises a TA-Lib call on a content hash of `close`.
+    Only exact hits are reused: extending a cached prefix by recomputing the tail is not bit-identical to a
+    full call (TA-Lib's running sums drift), so results would depend on what happened to be cached.
+    """
+    key = (hashlib.blake2b(close, digest_size=16).digest(), len(close), fn.__name__, frozenset(params.items()))
+    if key in _TA_CACHE:
+        _TA_CACHE.move_to_end(key)
+        return _TA_CACHE[key]
+
+    result = fn(close, **params)
+    _TA_CACHE[key] = result
+    if len(_TA_CACHE) > _TA_CACHE_SIZE:
+        _TA_CACHE.popitem(last=False)
+    return result
+
+def _fingerprint(path, block: int = 1 << 16) -> str:
+    """
+    Content fingerprint of a file from its size and its first and last 64 KiB.
+    Unlike mtime it survives rsync/git checkouts, and it costs two reads however large the file is.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=8)
+    with open(path, 'rb') as f:
+        digest.update(f.read(block))
+        if size > block:
+            f.seek(max(size - block, block))
+            digest.update(f.read(block))
+    return digest.hexdigest()
+
+@dataclass
+class TickerSOA:
+    """
+    Structure-of-arrays store for one ticker: every column is its own contiguous, C-order buffer.
+    Prices and features are float32; datetime is int64 nanoseconds. Feature fields are None when not generated.
+    """
+    datetime: np.ndarray
+    open: Optional[np.ndarray] = None
+    high: Optional[np.ndarray] = None
+    low: Optional[np.ndarray] = None
+    close: Optional[np.ndarray] = None
+    volume: Optional[np.ndarray] = None
+    returns: Optional[np.ndarray] = None
+    SMA_5: Optional[np.ndarray] = None
+    SMA_20: Optional[np.ndarray] = None
+    volatility: Optional[np.ndarray] = None
+    RSI: Optional[np.ndarray] = None
+    MACD: Optional[np.ndarray] = None
+    MACD_Signal: Optional[np.ndarray] = None
+    BB_upper: Optional[np.ndarray] = None
+    BB_middle: Optional[np.ndarray] = None
+    BB_lower: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> 'TickerSOA':
+        """Split a DataFrame into one contiguous buffer per known column."""
+        columns = {'datetime': np.ascontiguousarray(df['datetime'].to_numpy(dtype='datetime64[ns]').view(np.int64))}
+        for field in fields(cls)[1:]:
+            if field.name in df.columns:
+                columns[field.name] = np.ascontiguousarray(df[field.name].to_numpy(dtype=np.float32))
+        return cls(**columns)
+
+    def __len__(self) -> int:
+        return len(self.datetime)
+
+    def tail(self, lookback: int) -> 'TickerSOA':
+        """Return the last `lookback` rows as views (no copy)."""
+        return TickerSOA(**{field.name: getattr(self, field.name)[-lookback:] for field in fields(self) if getattr(self, field.name) is not None})
+
+    def as_dataframe(self) -> pd.DataFrame:
+        """Rebuild a DataFrame (for debugging/inspection)."""
+        columns = {field.name: getattr(self, field.name) for field in fields(self) if getattr(self, field.name) is not None}
+        columns['datetime'] = pd.to_datetime(columns['datetime'], unit='ns')
+        return pd.DataFrame(columns)
+
+# Aligned (T, K) panel of every loaded ticker: one C-order float64 matrix per price field, column k is symbols[k]
+MarketSOA = namedtuple('MarketSOA', 'index close open high low volume symbols')
 
 class DataLoader:
     # Utility class for loading financial data
-    def __init__(self, cache_data: bool = True, scaler_type: Optional[str] = None): # Added scaler_type
+    # Feature columns in the order they are created in get_features
+    FEATURE_COLUMNS: ClassVar[List[str]] = ['datetime', 'open', 'high', 'low', 'close', 'volume', 'returns', 'SMA_5', 'SMA_20', 'volatility', 'RSI', 'MACD', 'MACD_Signal', 'BB_upper', 'BB_middle', 'BB_lower']
+    _COLUMN_INDEX: ClassVar[Dict[str, int]] = {col: i for i, col in enumerate(FEATURE_COLUMNS)}
+    SCALED_COLUMNS = FEATURE_COLUMNS[1:]
+
+    def __init__(self, cache_data: bool = True, scaler_type: Optional[str] = None, cache_dir: Optional[str] = None): # Added scaler_type
         self.data: Dict[str, pd.DataFrame] = {}
-        self.logger = self._setup_logger()
+        self.soa: Dict[str, TickerSOA] = {} # Contiguous per-column arrays backing the hot accessors
+        self.logger = logger
         self.cache_data = cache_data
         self.scaler_type = scaler_type # Store scaler type
         self.scalers: Dict[str, Any] = {} # Dictionary to store scalers for each ticker
+        self._cache_dir = Path(cache_dir) if cache_dir else None # Opt-in on-disk Parquet cache of feature frames; None (the default) disables it
 
-    def _setup_logger(self) -> logging.Logger:
-        logger = logging.getLogger('DataLoader')
-        # Create console handler with a higher log level
-        ch = logging.StreamHandler()
-        logger.setLevel(logging.INFO)
-        # Create formatter and add it to the handlers
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        ch.setFormatter(formatter)
-        # Add the handlers to the logger
-        if not logger.handlers:
-            logger.addHandler(ch)
-        return logger
+    def _read_csv(self, file_path, structure: List[str], sep: str, chunk_rows: int = 1_000_000) -> pd.DataFrame:
+        """
+        Parses one CSV file. Paths go through PyArrow's multi-threaded typed reader when it is installed;
+        file-like objects (and installs without PyArrow) use pandas.read_csv in blocks of chunk_rows rows.
+        """
+        if pa is not None and isinstance(file_path, (str, Path)):
+            column_types = {col: pa.float32() if col in PRICE_DTYPES else pa.float64() for col in structure if col != 'datetime'}
+            column_types['datetime'] = pa.timestamp('ns')
+            if 'volume' in column_types:
+                column_types['volume'] = pa.int64()
+            # Parse straight out of a memory-mapped file instead of copying it into a read() buffer first
+            with pa.memory_map(str(file_path), 'r') as source:
+                table = pa_csv.read_csv(
+                    source,
+                    read_options=pa_csv.ReadOptions(use_threads=True, block_size=1 << 22),
+                    parse_options=pa_csv.ParseOptions(delimiter=sep),
+                    convert_options=pa_csv.ConvertOptions(column_types=column_types, include_columns=structure)
+                )
+            return table.to_pandas(self_destruct=True, split_blocks=True)
+        chunks = pd.read_csv(
+            file_path,
+            sep=sep,
+            parse_dates=['datetime'],
+            usecols=structure,
+            dtype={col: dtype for col, dtype in PRICE_DTYPES.items() if col in structure},
+            chunksize=chunk_rows
+        )
+        if pa is None:
+            return pd.concat(chunks, ignore_index=True)
+        # Park each block in Arrow memory and materialise pandas once, freeing Arrow columns as they convert
+        tables = [pa.Table.from_pandas(chunk, preserve_index=False) for chunk in chunks]
+        return pa.concat_tables(tables, promote_options='permissive').to_pandas(self_destruct=True, split_blocks=True)
+
+    def _read_one(self, file_path, stock_symbol: str, structure: List[str], sep: str, chunk_rows: int) -> Optional[pd.DataFrame]:
+        """
+        Reads and validates a single file. Returns None if the file is skipped and an empty
+        DataFrame if validation failed in a way that invalidates the whole ticker.
+        """
+        try:
+            df = self._read_csv(file_path, structure, sep, chunk_rows)
+            # Data Validation
+            if df.empty:
+                self.logger.warning(f"File {file_path} is empty for {stock_symbol}.")
+                return None
+
+            for col in structure:
+                if col not in df.columns:
+                    self.logger.error(f"Column '{col}' missing in {file_path} for {stock_symbol}.")
+                    return pd.DataFrame() # Return empty DataFrame if essential column is missing
+
+            # Type validation and correction
+            if not pd.api.types.is_datetime64_any_dtype(df['datetime']):
+                try:
+                    df['datetime'] = pd.to_datetime(df['datetime'])
+                except ValueError:
+                    self.logger.error(f"Invalid datetime format in {file_path} for {stock_symbol}.")
+                    return pd.DataFrame()
+
+            numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+            for col in numeric_cols:
+                if col in df.columns:
+                    try:
+                        df[col] = pd.to_numeric(df[col])
+                        if (df[col] < 0).any(): # Check for negative values in price/volume columns
+                            self.logger.warning(f"Negative values found in '{col}' column in {file_path} for {stock_symbol}. Clipping to 0.")
+                            df[col] = df[col].clip(lower=0) # Clip negative values to 0
+                    except ValueError:
+                        self.logger.error(f"Non-numeric values in '{col}' column in {file_path} for {stock_symbol}.")
+                        return pd.DataFrame()
+
+            # Handle missing values - Forward fill then backward fill
+            if self._fill_missing(df): # Final check for any remaining NaNs
+                self.logger.warning(f"Still missing values after fill in {file_path} for {stock_symbol}. Consider more robust data handling.")
+
+
+            # Per-file message: deferred %-formatting, skipped entirely when INFO is disabled
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info("Successfully read and validated %s", file_path)
+            return df
+        except Exception as e:
+            self.logger.error(f"Error reading {file_path}: {e}")
+            return None # Do not use df since it was not successfully read
+
+    def _fill_missing(self, df: pd.DataFrame) -> bool:
+        """
+        Forward then backward fills missing values in place and returns True if any remain.
+        Float columns of each dtype are stacked and filled by one Numba kernel; they are only
+        written back when something was actually filled.
+        """
+        nan_left = False
+        by_dtype: Dict[np.dtype, List[str]] = {}
+        for col in df.columns:
+            if pd.api.types.is_float_dtype(df[col].dtype):
+                by_dtype.setdefault(df[col].dtype, []).append(col)
+        for dtype, cols in by_dtype.items():
+            block = np.stack([df[col].to_numpy(dtype=dtype) for col in cols])
+            filled, left = _ffill_bfill(block)
+            if filled:
+                for col, values in zip(cols, block):
+                    df[col] = values
+            nan_left = nan_left or left
+
+        # Remaining non-float columns (datetime, object) cannot go through the kernel
+        for col in df.columns:
+            if not pd.api.types.is_float_dtype(df[col].dtype) and df[col].hasnans:
+                df[col] = df[col].ffill().bfill()
+                nan_left = nan_left or df[col].hasnans
+        return nan_left
 
     def read_stock_data(
         self,
         file_paths: List[str],
         stock_symbol: str,
         structure: List[str] = ['datetime', 'open', 'high', 'low', 'close', 'volume'],
-        sep: str = ';'
+        sep: str = ';',
+        chunk_rows: int = 1_000_000
         ) -> pd.DataFrame:
         """
         Reads and concatenates multiple CSV files for a given stock symbol with data validation.
+        Files are parsed concurrently; both parsers release the GIL while reading. The pandas
+        fallback parses at most chunk_rows rows at a time to bound peak memory on large files.
         """
-        dfs = []
-        for file_path in file_paths:
-            try:
-                df = pd.read_csv(
-                    file_path,
-                    sep=sep,
-                    parse_dates=['datetime'],
-                    usecols=structure
-                )
-                # Data Validation
-                if df.empty:
-                    self.logger.warning(f"File {file_path} is empty for {stock_symbol}.")
-                    continue
-
-                for col in structure:
-                    if col not in df.columns:
-                        self.logger.error(f"Column '{col}' missing in {file_path} for {stock_symbol}.")
-                        return pd.DataFrame() # Return empty DataFrame if essential column is missing
-
-                # Type validation and correction
-                if not pd.api.types.is_datetime64_any_dtype(df['datetime']):
-                    try:
-                        df['datetime'] = pd.to_datetime(df['datetime'])
-                    except ValueError:
-                        self.logger.error(f"Invalid datetime format in {file_path} for {stock_symbol}.")
-                        return pd.DataFrame()
-
-                numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-                for col in numeric_cols:
-                    if col in df.columns:
-                        try:
-                            df[col] = pd.to_numeric(df[col])
-                            if (df[col] < 0).any(): # Check for negative values in price/volume columns
-                                self.logger.warning(f"Negative values found in '{col}' column in {file_path} for {stock_symbol}. Clipping to 0.")
-                                df[col] = df[col].clip(lower=0) # Clip negative values to 0
-                        except ValueError:
-                            self.logger.error(f"Non-numeric values in '{col}' column in {file_path} for {stock_symbol}.")
-                            return pd.DataFrame()
-
-                # Handle missing values - Forward fill then backward fill
-                df.fillna(method='ffill', inplace=True)
-                df.fillna(method='bfill', inplace=True)
-                if df.isnull().any().any(): # Final check for any remaining NaNs
-                    self.logger.warning(f"Still missing values after fill in {file_path} for {stock_symbol}. Consider more robust data handling.")
-
-
-                self.logger.info(f"Successfully read and validated {file_path}")
-                dfs.append(df)
-            except Exception as e:
-                self.logger.error(f"Error reading {file_path}: {e}")
-                # Do not append df since it was not successfully read
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(file_paths)))) as ex:
+            results = list(ex.map(lambda file_path: self._read_one(file_path, stock_symbol, structure, sep, chunk_rows), file_paths))
+        if any(df is not None and df.empty for df in results):
+            return pd.DataFrame() # Return empty DataFrame if an essential column or type check failed
+        dfs = [df for df in results if df is not None]
         if dfs:
-            combined_df = pd.concat(dfs, ignore_index=True)
-            # Sort by 'datetime' in ascending order
-            combined_df = combined_df.sort_values(by='datetime', ascending=True).reset_index(drop=True)
-            return combined_df
+            return self._concat_by_datetime(dfs) # Sorted by 'datetime' in ascending order
         else:
             self.logger.warning(f"No valid dataframes to concatenate for {stock_symbol}.")
             return pd.DataFrame()  # Return empty DataFrame if no dataframes were read
 
+    def _concat_by_datetime(self, dfs: List[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Concatenates per-file frames in ascending datetime order. Files that are each sorted (in either
+        direction) and cover disjoint time ranges are stitched together without a global sort; otherwise
+        a stable mergesort on the datetime values exploits the sorted runs.
+        """
+        runs = []
+        for df in dfs:
+            if df['datetime'].is_monotonic_increasing:
+                runs.append(df)
+            elif df['datetime'].is_monotonic_decreasing:
+                runs.append(df.iloc[::-1])
+            else:
+                break
+        else:
+            runs.sort(key=lambda run: run['datetime'].iloc[0])
+            if all(prev['datetime'].iloc[-1] <= nxt['datetime'].iloc[0] for prev, nxt in zip(runs, runs[1:])):
+                return pd.concat(runs, ignore_index=True)
+        # Gather each column once through a stable argsort of the datetimes, skipping pandas' block concat and index rebuild
+        columns = {col: np.concatenate([df[col].to_numpy() for df in dfs]) for col in dfs[0].columns}
+        order = np.argsort(columns['datetime'], kind='stable')
+        return pd.DataFrame({col: np.take(values, order) for col, values in columns.items()})
+
     def load_ticker(self, stock_symbol: str, file_paths: List[str], structure: List[str] = ['datetime', 'open', 'high', 'low', 'close', 'volume'], sep: str = ';', return_numpy: bool = False, scale_features: bool = True) -> None: # Added scale_features
         """
         Loads data for a specific stock ticker, applies feature engineering and scaling, and stores it.
         """
         if self.cache_data and stock_symbol in self.data:
-            self.logger.info(f"Data for {stock_symbol} is already loaded and cached.")
+            self.logger.info("Data for %s is already loaded and cached.", stock_symbol)
             return
 
-        self.logger.info(f"Loading data for {stock_symbol}...")
+        self.logger.info("Loading data for %s...", stock_symbol)
+        cache_path = self._feature_cache_path(stock_symbol, file_paths, structure, sep)
+        if cache_path is not None and cache_path.exists():
+            features_df = self._read_feature_cache(cache_path)
+            if features_df is not None:
+                processed_df = features_df
+                if scale_features and self.scaler_type:
+                    processed_df = self._scale_data(stock_symbol, features_df)
+                self._store(stock_symbol, processed_df, return_numpy)
+                self.logger.info("Data with features for %s loaded from cache %s.", stock_symbol, cache_path)
+                return
+
         combined_df = self.read_stock_data(file_paths, stock_symbol, structure, sep)
 
         if not combined_df.empty:
             try:
                 features_df = self.get_features(combined_df)  # Pass DataFrame directly
                 if features_df is not None and not features_df.empty:
+                    self._write_feature_cache(cache_path, features_df)
                     processed_df = features_df
                     if scale_features and self.scaler_type: # Apply scaling if requested and scaler_type is set
                         processed_df = self._scale_data(stock_symbol, features_df)
 
                     if return_numpy:
-                        self.data[stock_symbol] = processed_df.drop(columns=['datetime']).values # Store numpy array, exclude datetime
-                        self.logger.info(f"Data with features for {stock_symbol} loaded as NumPy array.")
+                        self._store(stock_symbol, processed_df, return_numpy) # Store numpy array, exclude datetime
+                        self.logger.info("Data with features for %s loaded as NumPy array.", stock_symbol)
                     else:
-                        self.data[stock_symbol] = processed_df  # Update with processed data, store as DataFrame
-                        self.logger.info(f"Data with features for {stock_symbol} loaded as DataFrame.")
+                        self._store(stock_symbol, processed_df, return_numpy)  # Update with processed data, store as DataFrame
+                        self.logger.info("Data with features for %s loaded as DataFrame.", stock_symbol)
                 else:
                     self.logger.warning(f"Feature generation failed for {stock_symbol}, using raw data.")
                     if return_numpy:
-                        self.data[stock_symbol] = combined_df.drop(columns=['datetime']).values # Store raw data as numpy, exclude datetime
+                        self._store(stock_symbol, combined_df, return_numpy) # Store raw data as numpy, exclude datetime
                         self.logger.warning(f"Raw data for {stock_symbol} loaded as NumPy array.")
                     else:
-                        self.data[stock_symbol] = combined_df # Store raw data as DataFrame
+                        self._store(stock_symbol, combined_df, return_numpy) # Store raw data as DataFrame
                         self.logger.warning(f"Raw data for {stock_symbol} loaded as DataFrame.")
 
             except Exception as e:
                 self.logger.error(f"Error during feature generation for {stock_symbol}: {e}")
                 if return_numpy:
-                    self.data[stock_symbol] = combined_df.drop(columns=['datetime']).values # Store raw data as numpy, exclude datetime
+                    self._store(stock_symbol, combined_df, return_numpy) # Store raw data as numpy, exclude datetime
                     self.logger.warning(f"Raw data for {stock_symbol} loaded as NumPy array due to error.")
                 else:
-                    self.data[stock_symbol] = combined_df # Store raw data as DataFrame
+                    self._store(stock_symbol, combined_df, return_numpy) # Store raw data as DataFrame
                     self.logger.warning(f"Raw data for {stock_symbol} loaded as DataFrame due to error.")
         else:
             self.logger.warning(f"No data loaded for {stock_symbol}.")
 
+    def load_all(self, tickers: Dict[str, List[str]], structure: List[str] = ['datetime', 'open', 'high', 'low', 'close', 'volume'], sep: str = ';', return_numpy: bool = False, scale_features: bool = True, max_workers: Optional[int] = None) -> None:
+        """
+        Loads several tickers at once, one worker process per ticker, so CSV parsing and
+        feature generation for different symbols run on separate cores.
+        Tickers already held (with cache_data) are skipped.
+        """
+        pending = {symbol: paths for symbol, paths in tickers.items() if not (self.cache_data and symbol in self.data)}
+        if not pending:
+            return
+        jobs = [(symbol, paths, structure, sep, scale_features, self.scaler_type, self._cache_dir) for symbol, paths in pending.items()]
+        if len(jobs) == 1:
+            results = [self._load_worker(jobs[0])] # Not worth a pool for a single ticker
+        else:
+            workers = max_workers or min(os.cpu_count() or 1, len(jobs))
+            # spawn rather than fork: the parent already runs Arrow/Numba thread pools that a forked child would inherit mid-state
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                results = list(executor.map(self._load_worker, jobs))
+
+        for symbol, df, scaler in results:
+            if df is None:
+                self.logger.warning(f"No data loaded for {symbol}.")
+                continue
+            self._store(symbol, df, return_numpy)
+            if scaler is not None:
+                self.scalers[symbol] = scaler
+        self.logger.info(f"Loaded {sum(df is not None for _, df, _ in results)} of {len(jobs)} tickers.")
+
+    @staticmethod
+    def _load_worker(job: tuple) -> tuple:
+        """
+        Runs load_ticker for one symbol in a fresh DataLoader and returns (symbol, frame, scaler).
+        """
+        symbol, paths, structure, sep, scale_features, scaler_type, cache_dir = job
+        loader = DataLoader(cache_data=False, scaler_type=scaler_type, cache_dir=cache_dir)
+        loader.load_ticker(symbol, paths, structure, sep, return_numpy=False, scale_features=scale_features)
+        return symbol, loader.data.get(symbol), loader.scalers.get(symbol)
+
+    def _feature_cache_path(self, stock_symbol: str, file_paths: List[str], structure: List[str], sep: str) -> Optional[Path]:
+        """
+        Path of the Parquet cache entry for these inputs, or None when caching does not apply
+        (no PyArrow, caching disabled, or inputs that are not files on disk).
+        """
+        if pa is None or self._cache_dir is None:
+            return None
+        if not all(isinstance(p, (str, Path)) and os.path.isfile(p) for p in file_paths):
+            return None
+        ordered = sorted(file_paths, key=str)
+        key = hashlib.md5((','.join(str(p) for p in ordered) + ','.join(_fingerprint(p) for p in ordered) + ','.join(structure) + sep + FEATURE_VERSION).encode()).hexdigest()
+        return self._cache_dir / f'{stock_symbol}_{key}.parquet'
+
+    def _read_feature_cache(self, cache_path: Path) -> Optional[pd.DataFrame]:
+        """Loads a cached feature frame, or None if the entry can't be read."""
+        try:
+            return pq.read_table(cache_path).to_pandas(self_destruct=True)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable cache entry {cache_path}: {e}")
+            return None
+
+    def _write_feature_cache(self, cache_path: Optional[Path], features_df: pd.DataFrame) -> None:
+        """Writes the feature frame to the Parquet cache (zstd); failures only log a warning."""
+        if cache_path is None:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            pq.write_table(pa.Table.from_pandas(features_df, preserve_index=False), cache_path, compression='zstd', compression_level=3)
+        except Exception as e:
+            self.logger.warning(f"Could not write cache entry {cache_path}: {e}")
+
+    def _store(self, stock_symbol: str, df: pd.DataFrame, return_numpy: bool) -> None:
+        """
+        Stores the frame (or its NumPy export) in self.data and its SoA arrays in self.soa.
+        """
+        self.soa[stock_symbol] = TickerSOA.from_dataframe(df)
+        if return_numpy:
+            # Frames built from CSV export in Fortran order; force row-major so per-bar row reads stay contiguous
+            mat = np.ascontiguousarray(df.drop(columns=['datetime']).to_numpy(dtype=np.float32))
+            assert mat.flags['C_CONTIGUOUS']
+            self.data[stock_symbol] = mat
+        else:
+            self.data[stock_symbol] = df
+
     def _scale_data(self, stock_symbol: str, features_df: pd.DataFrame) -> pd.DataFrame:
         """
         Scales the features DataFrame based on self.scaler_type.
+        Scales in place: the caller passes a frame it owns, so no defensive copy is made.
         """
-        df_scaled = features_df.copy()
-        scaler = None
         if self.scaler_type == 'standard':
-            scaler = StandardScaler()
+            scaler = StandardScaler(copy=False)
         elif self.scaler_type == 'minmax':
-            scaler = MinMaxScaler()
+            scaler = MinMaxScaler(copy=False)
         else:
-            return df_scaled # No scaling
+            return features_df # No scaling
 
-        numerical_cols = ['open', 'high', 'low', 'close', 'volume', 'returns', 'SMA_5', 'SMA_20', 'volatility', 'RSI', 'MACD', 'MACD_Signal', 'BB_upper', 'BB_middle', 'BB_lower']
-        cols_to_scale = [col for col in numerical_cols if col in df_scaled.columns] # Scale only available columns
+        cols_to_scale = [col for col in self.SCALED_COLUMNS if col in features_df.columns] # Scale only available columns
         if cols_to_scale:
-            df_scaled[cols_to_scale] = scaler.fit_transform(df_scaled[cols_to_scale])
+            # Stack the columns into one C-order float32 matrix; copy=False scalers transform it in place
+            mat = np.empty((len(features_df), len(cols_to_scale)), dtype=np.float32, order='C')
+            for j, col in enumerate(cols_to_scale):
+                mat[:, j] = features_df[col].to_numpy(dtype=np.float32)
+            features_df[cols_to_scale] = scaler.fit_transform(mat)
             self.scalers[stock_symbol] = scaler # Store scaler for potential inverse transform later
-            self.logger.info(f"Features for {stock_symbol} scaled using {self.scaler_type} scaler.")
+            self.logger.info("Features for %s scaled using %s scaler.", stock_symbol, self.scaler_type)
         else:
             self.logger.warning(f"No numerical columns to scale for {stock_symbol}.")
-        return df_scaled
+        return features_df
 
     def get_latest_price(self, ticker: str) -> float:
         """Get most recent price for a ticker."""
+        if ticker in self.soa and self.soa[ticker].close is not None:
+            return self.soa[ticker].close[-1]
         if ticker in self.data:
             if isinstance(self.data[ticker], pd.DataFrame):
                 return self.data[ticker]['close'].iloc[-1]
             elif isinstance(self.data[ticker], np.ndarray):
-                close_col_index = self.get_feature_columns().index('close') # Assuming 'close' is still a feature
-                return self.data[ticker][-1, close_col_index] # Access by index
+                # NumPy matrices are stored without the datetime column, hence the -1
+                return self.data[ticker][-1, self._COLUMN_INDEX['close'] - 1]
         return None
 
-    def get_price_history(self, ticker: str, lookback: int = None) -> pd.DataFrame or np.ndarray:
+    def get_price_history(self, ticker: str, lookback: int = None) -> Union[pd.DataFrame, np.ndarray, None]:
         """Get price history for a ticker with optional lookback period."""
         if ticker not in self.data:
             return None
@@ -188,6 +479,36 @@ class DataLoader:
                 return data[-lookback:]
         return data
 
+    def get_price_history_soa(self, ticker: str, lookback: int = None) -> Optional[TickerSOA]:
+        """Get price history for a ticker as its SoA arrays (views over the last lookback rows when given)."""
+        soa = self.soa.get(ticker)
+        if soa is None:
+            return None
+        return soa.tail(lookback) if lookback else soa
+
+    def as_soa(self, tickers: Optional[List[str]] = None) -> MarketSOA:
+        """
+        Stack the loaded tickers into a MarketSOA on the datetimes they all share.
+        Fields a ticker does not have are left NaN.
+        """
+        symbols = tuple(tickers if tickers is not None else self.soa)
+        if not symbols:
+            raise ValueError("No tickers loaded")
+        stamps = np.unique(self.soa[symbols[0]].datetime)
+        for symbol in symbols[1:]:
+            stamps = np.intersect1d(stamps, self.soa[symbol].datetime)
+
+        panel = {name: np.full((len(stamps), len(symbols)), np.nan) for name in MarketSOA._fields[1:-1]}
+        for k, symbol in enumerate(symbols):
+            soa = self.soa[symbol]
+            order = np.argsort(soa.datetime, kind='stable')
+            rows = order[np.searchsorted(soa.datetime, stamps, sorter=order)] # First row of every shared datetime
+            for name, mat in panel.items():
+                column = getattr(soa, name)
+                if column is not None:
+                    mat[:, k] = column[rows]
+        return MarketSOA(index=pd.DatetimeIndex(stamps.view('datetime64[ns]'), name='datetime'), symbols=symbols, **panel)
+
     def get_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Get feature matrix suitable for ML models.
@@ -195,41 +516,50 @@ class DataLoader:
         if df.empty:
             return None
 
-        df = df.copy()
-
+        # Shallow copy: shares the caller's column data, so only the new feature columns are allocated
+        df = df.copy(deep=False)
         try:
-            # Calculate returns
-            df['returns'] = df['close'].pct_change()
+            # One contiguous float64 close buffer shared by every kernel and TA-Lib call
+            close = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+            feat = {}
+
+            # Calculate returns and their 20-bar volatility in one fused pass
+            feat['returns'] = np.empty_like(close)
+            feat['SMA_5'] = np.empty_like(close)
+            feat['SMA_20'] = np.empty_like(close)
+            feat['volatility'] = np.empty_like(close)
+            _returns_and_vol(close, 20, feat['returns'], feat['volatility'])
 
-            # Add basic technical indicators
-            df['SMA_5'] = df['close'].rolling(window=5).mean()
-            df['SMA_20'] = df['close'].rolling(window=20).mean()
-            df['volatility'] = df['returns'].rolling(window=20).std()
+            # Add basic technical indicators (O(N) running-sum kernels instead of pandas rolling)
+            _rolling_sma(close, 5, feat['SMA_5'])
+            _rolling_sma(close, 20, feat['SMA_20'])
 
             # Add RSI
-            df['RSI'] = talib.RSI(df['close'].values, timeperiod=14)
+            feat['RSI'] = _cached_ta(close, talib.RSI, timeperiod=14)
 
             # Add MACD
-            macd, macdsignal, macdhist = talib.MACD(
-                df['close'].values,
+            feat['MACD'], feat['MACD_Signal'], _ = _cached_ta(
+                close,
+                talib.MACD,
                 fastperiod=12,
                 slowperiod=26,
                 signalperiod=9
             )
-            df['MACD'] = macd
-            df['MACD_Signal'] = macdsignal
 
             # Add Bollinger Bands
-            upperband, middleband, lowerband = talib.BBANDS(
-                df['close'].values,
+            feat['BB_upper'], feat['BB_middle'], feat['BB_lower'] = _cached_ta(
+                close,
+                talib.BBANDS,
                 timeperiod=20,
                 nbdevup=2,
                 nbdevdn=2,
                 matype=0
             )
-            df['BB_upper'] = upperband
-            df['BB_middle'] = middleband
-            df['BB_lower'] = lowerband
+            # Kernels and TA-Lib work in float64; store the results at the float32 precision of the inputs.
+            # Column assignment on the shallow copy adds new blocks without touching the caller's df
+            # (assign() would deep-copy every existing column first on pandas < 3).
+            for name, values in feat.items():
+                df[name] = values.astype(np.float32)
 
             # Ensure datetime is correct
             if not pd.api.types.is_datetime64_any_dtype(df['datetime']):
@@ -242,5 +572,4 @@ class DataLoader:
 
     def get_feature_columns(self):
         """Returns a list of feature column names, assuming features are generated."""
-        # Define the feature columns in the order they are created in get_features
-        return ['datetime', 'open', 'high', 'low', 'close', 'volume', 'returns', 'SMA_5', 'SMA_20', 'volatility', 'RSI', 'MACD', 'MACD_Signal', 'BB_upper', 'BB_middle', 'BB_lower']
\ No newline at end of file
+        return list(self.FEATURE_COLUMNS)
\ No newline at end of file
@@ -1,7 +1,105 @@
+import copy
 import logging
-from typing import Dict, Any
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
 import pandas as pd
 import multiprocessing
+from .Strategy import Strategy
+from .Portfolio import Portfolio
+from .utils import indicator_arrays
+
+_SIGNAL_TILE = 1 << 16 # Bars per tile when several strategies share a ticker's columns (~256 KB per float32 column)
+
+def _setup_logger():
+    logger = logging.getLogger('Engine')
+    if not logger.handlers:
+        ch = logging.StreamHandler()
+        ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(ch)
+        logger.setLevel(logging.INFO)
+    return logger
+
+_default_logger = _setup_logger() # Set up once per process; every Engine (one per worker task) shares it unless given its own
+
+def _to_shared_memory(columns: Dict[str, np.ndarray]) -> Tuple[shared_memory.SharedMemory, Dict[str, tuple]]:
+    """
+    Packs a ticker's column arrays into one shared memory block (8-byte aligned).
+    Returns the block and a {column: (offset, shape, dtype)} layout for rebuilding views in a worker.
+    """
+    columns = {col: values for col, values in columns.items() if not values.dtype.hasobject} # Object columns cannot live in a raw buffer
+    layout = {}
+    offset = 0
+    for col, values in columns.items():
+        offset = -(-offset // 8) * 8
+        layout[col] = (offset, values.shape, values.dtype.str)
+        offset += values.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for col, values in columns.items():
+        col_offset, shape, dtype = layout[col]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=col_offset)[...] = values
+    return shm, layout
+
+def _run_ticker_worker(task: tuple) -> tuple:
+    """
+    Worker side of Engine.run_backtest: attaches to the ticker's shared memory block, runs the strategy
+    against a snapshot of the portfolio and returns (ticker, cash delta, position, trade arrays, pending orders).
+    """
+    ticker, shm_name, layout, strategy, portfolio = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        columns = {col: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for col, (offset, shape, dtype) in layout.items()}
+        result = _run_ticker(ticker, columns, strategy, portfolio)
+        del columns # Drop the views before closing, or the buffer is still exported
+        return result
+    finally:
+        shm.close()
+
+def _run_ticker(ticker, columns: Dict[str, np.ndarray], strategy, portfolio, signals: Optional[np.ndarray] = None) -> tuple:
+    """
+    Runs one ticker against a portfolio snapshot and returns (ticker, cash delta, position, trade arrays, pending orders).
+    """
+    engine = Engine._for_worker(portfolio, strategy)
+    starting_cash = portfolio.cash
+    engine._run_columns(ticker, columns, signals)
+    return ticker, portfolio.cash - starting_cash, portfolio.positions.get(ticker), portfolio.trades_as_arrays(), portfolio.pending_orders
+
+def _tiled_signals(strategies, columns: Dict[str, np.ndarray], tile: Optional[int] = None) -> List[Optional[np.ndarray]]:
+    """
+    generate_signals for several strategies over one ticker, tile by tile: every strategy consumes a tile before
+    the next one is touched, so the tile's columns stay in cache across strategies instead of being streamed
+    once per strategy. Strategies carry their crossover state from tile to tile.
+    A strategy whose first tile returns None gets None (it runs bar by bar); returning None on a later tile raises ValueError.
+    """
+    tile = tile or _SIGNAL_TILE
+    n = len(columns['close'])
+    out: List[Optional[np.ndarray]] = [np.empty(n, dtype=np.int8) for _ in strategies]
+    for start in range(0, max(n, 1), tile):
+        chunk = {col: values[start:start + tile] for col, values in columns.items()}
+        for k, strategy in enumerate(strategies):
+            if out[k] is None:
+                continue
+            signals = strategy.generate_signals(chunk)
+            if signals is None:
+                if start:
+                    # Earlier tiles already advanced the strategy's state, so it cannot restart bar by bar here
+                    raise ValueError(f"{type(strategy).__name__}.generate_signals returned None for the tile at bar {start} "
+                                     "after returning signals for earlier tiles")
+                out[k] = None
+            else:
+                out[k][start:start + tile] = signals
+    return out
+
+def _run_ticker_strategies(ticker, columns: Dict[str, np.ndarray], strategies, portfolios) -> List[tuple]:
+    """
+    Runs several strategies over one ticker, each against its own portfolio snapshot, with their signals
+    generated tile by tile. Returns one _run_ticker result per strategy.
+    """
+    signals = _tiled_signals(strategies, columns)
+    return [_run_ticker(ticker, columns, strategy, portfolio, strategy_signals)
+            for strategy, portfolio, strategy_signals in zip(strategies, portfolios, signals)]
 
 class Engine:
     """
@@ -12,81 +110,311 @@ class Engine:
         self.data_loader = data_loader
         self.portfolio = portfolio
         self.strategy = strategy
-        self.logger = logger or self._setup_logger()
+        self._columns_cache: Dict[str, Tuple[pd.DataFrame, tuple, Dict[str, np.ndarray]]] = {} # ticker -> (source frame, indicator specs, column arrays)
+        self.logger = logger or _default_logger
         self.logger.info("Engine initialized.")
 
-    def _setup_logger(self):
-        logger = logging.getLogger('Engine')
-        if not logger.handlers:
-            ch = logging.StreamHandler()
-            ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-            logger.addHandler(ch)
-            logger.setLevel(logging.INFO)
-        return logger
+    @classmethod
+    def _for_worker(cls, portfolio, strategy) -> 'Engine':
+        """
+        Engine for one worker task (no DataLoader). Bypasses __init__, so the "Engine initialized." line
+        is not logged once per ticker per worker.
+        """
+        engine = cls.__new__(cls)
+        engine.data_loader = None
+        engine.portfolio = portfolio
+        engine.strategy = strategy
+        engine._columns_cache = {}
+        engine.logger = _default_logger
+        return engine
 
     def _run_backtest_single_ticker(self, ticker):
         """
         Run backtest for a single ticker, including order processing at each step.
         """
-        self.logger.info(f"Starting backtest for ticker: {ticker} in process {multiprocessing.current_process().name}")
-        df = self._get_data(ticker)
-        if df.empty:
+        self.logger.info("Starting backtest for ticker: %s in process %s", ticker, multiprocessing.current_process().name)
+        columns = self._get_ticker_columns(ticker)
+        if columns is None:
             return
 
-        for idx in range(len(df)):
-            current_row = df.iloc[idx]
-            current_data = df.iloc[:idx+1]
-            current_time = current_row['datetime'] # Get current datetime for order processing
-            current_price = current_row['close']
+        # Bars read the per-column arrays by index instead of slicing the frame
+        self._run_columns(ticker, columns)
+
+    def _run_columns(self, ticker, columns: Dict[str, np.ndarray], signals: Optional[np.ndarray] = None):
+        """
+        Run the strategy over one ticker's column arrays (as built by _get_columns).
+        signals, if given, is the strategy's generate_signals output for these columns, already computed.
+        """
+        close = columns['close']
+        datetimes = columns['datetime']
+        proc_name = multiprocessing.current_process().name
+
+        # Fast path: strategies with a vectorised form and no pending limit/stop orders run the whole ticker
+        # through the compiled order loop; everything else goes bar by bar below
+        if signals is None:
+            signals = self.strategy.generate_signals(columns)
+        if signals is not None and not self.portfolio.pending_orders:
+            self.portfolio.handle_signal_array(ticker, close, signals)
+            if len(close):
+                self.portfolio.update_prices({ticker: close[-1]})
+            self.logger.info("Backtest for ticker %s completed in process %s", ticker, proc_name)
+            return
 
-            # Ensure 'datetime' is datetime type
-            if not pd.api.types.is_datetime64_any_dtype(current_data['datetime']):
-                current_data['datetime'] = pd.to_datetime(current_data['datetime'])
+        # Bind the per-bar methods once so the loop does local lookups instead of attribute chains
+        update_prices = self.portfolio.update_prices
+        process_orders = self.portfolio.process_orders
+        handle_signal = self.portfolio.handle_signal
+        generate_signal = self.strategy.generate_signal
+        current_prices_for_processing = {ticker: 0.0} # Reused every bar; neither consumer keeps a reference to it
+        # Strategies see a bounded, read-only window of closes rather than the whole prefix
+        lookback = getattr(self.strategy, 'required_lookback', None)
+        close_view = close.view()
+        close_view.flags.writeable = False
+        market_data = {'close': None, 'close_history': None, 'idx': 0, 'columns': columns} # Refilled in place every bar
 
-            market_data = {'close': current_price, 'df': current_data}
+        for idx in range(len(close)):
+            current_time = datetimes[idx] # Get current datetime for order processing
+            current_price = close[idx]
 
             # Process pending orders before generating new signals
-            current_prices_for_processing = {ticker: current_price} # For now, process orders based on current ticker price only
-            self.portfolio.process_orders(current_time, current_prices_for_processing) # Process orders at each time step
+            current_prices_for_processing[ticker] = current_price # For now, process orders based on current ticker price only
+            update_prices(current_prices_for_processing)
+            process_orders(current_time, current_prices_for_processing) # Process orders at each time step
 
-            # Generate signal
-            signal = self.strategy.generate_signal(ticker, market_data)
+            # Generate signal; vectorised strategies already produced every bar's signal, so only look it up
+            if signals is None:
+                start = 0 if lookback is None else max(0, idx + 1 - lookback)
+                market_data['close'] = current_price
+                market_data['close_history'] = close_view[start:idx+1]
+                market_data['idx'] = idx
+                signal = generate_signal(ticker, market_data)
+            else:
+                signal = signals[idx] # Signal code; HOLD (0) is falsy
 
             # Execute trade if signal is present (default Market order for now)
             if signal:
-                self.portfolio.handle_signal(ticker, signal, current_price=current_price, index=idx) # Default Market order
+                handle_signal(ticker, signal, current_price=current_price, index=idx) # Default Market order
 
         # Process any remaining pending orders at the end of backtest - optional, depends on strategy
         # current_prices_end = {ticker: self._get_data(ticker)['close'].iloc[-1]} # Get last prices - careful with look-ahead bias
         # self.portfolio.process_orders("End of Backtest", current_prices_end)
 
-        self.logger.info(f"Backtest for ticker {ticker} completed in process {multiprocessing.current_process().name}")
+        self.logger.info("Backtest for ticker %s completed in process %s", ticker, proc_name)
 
 
-    def run_backtest(self, tickers):
+    def run_backtest(self, tickers, cash_per_ticker: Optional[float] = None):
         """
-        Main loop to run backtest for all tickers concurrently using multiprocessing.
+        Main loop to run backtest for all tickers concurrently.
+        Vectorised strategies run on a thread pool, since their time is spent in NumPy and the GIL-free order kernel.
+        Otherwise each ticker's columns are placed in shared memory once and run on a process pool.
+        Either way workers return their trades, which are merged back into this Engine's portfolio before the final metrics.
+        With several tickers each worker trades against its own cash allocation: cash_per_ticker, or by default the
+        portfolio's cash split evenly across the tickers (a single ticker runs against the whole portfolio).
+        Loops are ticker-outer / bar-inner, so each ticker's columns are streamed once, front to back.
         """
-        self.logger.info(f"Starting concurrent backtest for tickers: {tickers}")
-        processes = []
-
-        for ticker in tickers:
-            process = multiprocessing.Process(target=self._run_backtest_single_ticker, args=(ticker,))
-            processes.append(process)
-            process.start()
-
-        for process in processes:
-            process.join() # Wait for all processes to complete
+        self.logger.info("Starting concurrent backtest for tickers: %s", tickers)
+        # Resolve every ticker's column arrays once, up front
+        columns_by_ticker = {ticker: self._get_ticker_columns(ticker) for ticker in tickers}
+        tickers = [ticker for ticker, columns in columns_by_ticker.items() if columns is not None]
+        if len(tickers) == 1:
+            self._run_backtest_single_ticker(tickers[0]) # No pool needed; updates the portfolio directly
+        elif tickers and self._runs_vectorised():
+            # Threads share the column arrays as-is: no process spawn, no pickling
+            allocation = self._ticker_allocation(len(tickers), cash_per_ticker)
+            strategies = [copy.deepcopy(self.strategy) for _ in tickers] # Deep copies: strategies carry per-ticker state (crossover values, close deques)
+            snapshots = [self._portfolio_snapshot(ticker, allocation) for ticker in tickers]
+            with ThreadPoolExecutor(max_workers=min(len(tickers), os.cpu_count() or 1)) as executor:
+                for result in executor.map(_run_ticker, tickers, [columns_by_ticker[ticker] for ticker in tickers], strategies, snapshots):
+                    self._merge_result(*result)
+        elif tickers:
+            segments: List[shared_memory.SharedMemory] = []
+            try:
+                allocation = self._ticker_allocation(len(tickers), cash_per_ticker)
+                tasks = []
+                for ticker in tickers:
+                    shm, layout = _to_shared_memory(columns_by_ticker[ticker])
+                    segments.append(shm)
+                    tasks.append((ticker, shm.name, layout, self.strategy, self._portfolio_snapshot(ticker, allocation)))
+                workers = min(len(tasks), os.cpu_count() or 1)
+                # spawn rather than fork: the parent may be running Arrow/Numba thread pools
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                    # Batch tickers per round trip for large universes, keeping ~4 batches per worker for load balance
+                    chunksize = max(1, len(tasks) // (4 * workers))
+                    for result in executor.map(_run_ticker_worker, tasks, chunksize=chunksize):
+                        self._merge_result(*result)
+            finally:
+                for shm in segments:
+                    shm.close()
+                    shm.unlink()
 
         self.logger.info("Concurrent backtest completed for all tickers.")
         self.portfolio.calculate_final_metrics()
 
+    def _ticker_allocation(self, n_tickers: int, cash_per_ticker: Optional[float] = None) -> float:
+        """
+        Cash each of n_tickers worker snapshots may spend: cash_per_ticker, or the portfolio's cash split evenly.
+        The allocations never add up to more than the portfolio's cash, so the merged cash cannot go below zero.
+        """
+        if cash_per_ticker is None:
+            return self.portfolio.cash / n_tickers
+        if cash_per_ticker * n_tickers > self.portfolio.cash:
+            raise ValueError(f"cash_per_ticker={cash_per_ticker} for {n_tickers} tickers exceeds the portfolio's cash ({self.portfolio.cash})")
+        return float(cash_per_ticker)
+
+    def _portfolio_snapshot(self, ticker, cash: float):
+        """
+        Lightweight copy of the portfolio for one worker: that ticker's position and orders only, no DataLoader,
+        and `cash` (its allocation from _ticker_allocation) in place of the portfolio's whole balance.
+        """
+        snapshot = copy.copy(self.portfolio)
+        snapshot.cash = cash
+        snapshot.data_loader = None
+        snapshot.trade_log = []
+        snapshot.positions = {ticker: copy.copy(self.portfolio.positions[ticker])} if ticker in self.portfolio.positions else {}
+        # Own position arrays, so a snapshot running on a thread cannot write into the parent's
+        snapshot._pos_idx = dict(self.portfolio._pos_idx)
+        snapshot._pos_qty = self.portfolio._pos_qty.copy()
+        snapshot._pos_entry = self.portfolio._pos_entry.copy()
+        snapshot._last_price = self.portfolio._last_price.copy()
+        snapshot._reset_slippage(self.portfolio._rng.spawn(1)[0]) # Independent slippage stream per ticker
+        snapshot.pending_orders = [order for order in self.portfolio.pending_orders if order.ticker == ticker]
+        return snapshot
+
+    def _runs_vectorised(self) -> bool:
+        """
+        Whether every ticker will take the vectorised path in _run_columns (a generate_signals override, no pending orders).
+        """
+        return type(self.strategy).generate_signals is not Strategy.generate_signals and not self.portfolio.pending_orders
+
+    def _merge_result(self, ticker, cash_delta, position, trades, pending_orders):
+        """
+        Fold one worker's result into the parent portfolio.
+        cash_delta is relative to the worker's allocation, which was part of the parent's cash.
+        """
+        if self.portfolio.cash + cash_delta < 0:
+            self.logger.warning("Merging %s takes cash below zero (%.2f); allocations exceeded the portfolio's cash.", ticker, self.portfolio.cash + cash_delta)
+        self.portfolio.cash += cash_delta
+        if position is not None:
+            self.portfolio._set_position(ticker, position.quantity, position.entry_price)
+            if position.current_price is not None:
+                self.portfolio.update_prices({ticker: position.current_price})
+        self.portfolio._extend_trades(ticker, trades['side'], trades['quantity'], trades['price'], trades['execution_price'], trades['index'])
+        self.portfolio.pending_orders = [order for order in self.portfolio.pending_orders if order.ticker != ticker] + pending_orders
+
+    def _get_ticker_columns(self, ticker) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Column arrays for a ticker, built once and reused until the DataLoader holds a different frame for it.
+        Returns None when the ticker has no data.
+        """
+        df = self._get_data(ticker)
+        if df is None or df.empty:
+            return None
+        indicators = tuple(getattr(self.strategy, 'required_indicators', ()))
+        cached = self._columns_cache.get(ticker)
+        if cached is not None and cached[0] is df and cached[1] == indicators:
+            return cached[2]
+        # Missing indicator columns are computed here, once per ticker, rather than inside the bar loop
+        columns = self._get_columns(df)
+        columns.update(indicator_arrays(columns['close'], indicators, present=columns))
+        self._columns_cache[ticker] = (df, indicators, columns) # Holding the frame keeps the identity check sound
+        return columns
+
+    def _get_columns(self, df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Split a ticker's frame into contiguous per-column arrays: close as float64, datetime as datetime64[ns].
+        """
+        columns = {col: np.ascontiguousarray(df[col].to_numpy()) for col in df.columns if col != 'datetime'}
+        columns['close'] = np.ascontiguousarray(df['close'].to_numpy(dtype=np.float64))
+        # Ensure 'datetime' is datetime type (once per ticker rather than once per bar); unparseable values become NaT
+        datetimes = df['datetime'] if pd.api.types.is_datetime64_any_dtype(df['datetime']) else pd.to_datetime(df['datetime'], errors='coerce')
+        columns['datetime'] = datetimes.to_numpy(dtype='datetime64[ns]')
+        assert columns['datetime'].dtype.kind == 'M'
+        return columns
 
     def _get_data(self, ticker):
         """
-        Fetch data for the given ticker from the DataLoader.
+        Fetch data for the given ticker from the DataLoader. Returns None if the ticker is not loaded.
         """
-        if ticker not in self.data_loader.data:
-            self.logger.warning(f"Ticker {ticker} not loaded.")
-            return pd.DataFrame()
-        return self.data_loader.data[ticker]
\ No newline at end of file
+        df = self.data_loader.data.get(ticker)
+        if df is None:
+            self.logger.warning("Ticker %s not loaded.", ticker)
+        return df
+
+def run_strategies(data_loader, strategies, tickers, cash_per_ticker: Optional[float] = None, **portfolio_kwargs) -> List[Portfolio]:
+    """
+    Backtest several strategies over the same tickers, each against its own fresh Portfolio(**portfolio_kwargs).
+    Every (strategy, ticker) pair is one task on a shared pool, so strategies run side by side rather than one
+    run_backtest after another: vectorised strategies on threads, the rest on a process pool, with each ticker's
+    columns (holding every strategy's required indicators) placed in shared memory once for all of them.
+    With at least as many tickers as workers, vectorised strategies instead run one task per ticker and
+    generate their signals over it tile by tile (see _tiled_signals).
+    As in Engine.run_backtest, each (strategy, ticker) task trades against its own cash allocation: cash_per_ticker,
+    or by default the portfolio's cash split evenly across the tickers.
+    Returns the portfolios, in strategy order, with final metrics calculated.
+    """
+    engines = []
+    for strategy in strategies:
+        portfolio = Portfolio(**portfolio_kwargs)
+        portfolio.set_data_loader(data_loader)
+        engines.append(Engine(data_loader, portfolio, strategy))
+    if not engines:
+        return []
+
+    specs = tuple(dict.fromkeys(spec for strategy in strategies for spec in getattr(strategy, 'required_indicators', ())))
+    columns_by_ticker = {}
+    for ticker in tickers:
+        df = engines[0]._get_data(ticker)
+        if df is not None and not df.empty:
+            columns = engines[0]._get_columns(df)
+            columns.update(indicator_arrays(columns['close'], specs, present=columns))
+            columns_by_ticker[ticker] = columns
+    tickers = list(columns_by_ticker)
+    allocations = {engine: engine._ticker_allocation(len(tickers), cash_per_ticker) for engine in engines} if tickers else {}
+
+    thread_tasks = [(engine, ticker) for engine in engines if engine._runs_vectorised() for ticker in tickers]
+    process_tasks = [(engine, ticker) for engine in engines if not engine._runs_vectorised() for ticker in tickers]
+    workers = os.cpu_count() or 1
+    segments: Dict[str, Tuple[shared_memory.SharedMemory, Dict[str, tuple]]] = {}
+    try:
+        process_results = []
+        executor = None
+        if process_tasks:
+            for ticker in tickers:
+                segments[ticker] = _to_shared_memory(columns_by_ticker[ticker])
+            executor = ProcessPoolExecutor(max_workers=min(len(process_tasks), workers), mp_context=multiprocessing.get_context('spawn'))
+            # Submitted first so the processes work while the threads below run
+            process_results = [executor.submit(_run_ticker_worker, (ticker, segments[ticker][0].name, segments[ticker][1],
+                                                                    engine.strategy, engine._portfolio_snapshot(ticker, allocations[engine])))
+                               for engine, ticker in process_tasks]
+        try:
+            vectorised = list(dict.fromkeys(engine for engine, _ in thread_tasks))
+            if len(vectorised) > 1 and len(tickers) >= workers:
+                # Enough tickers to keep every worker busy: one task per ticker, whose strategies share its columns tile by tile
+                with ThreadPoolExecutor(max_workers=workers) as threads:
+                    results = threads.map(_run_ticker_strategies, tickers, [columns_by_ticker[ticker] for ticker in tickers],
+                                          [[copy.deepcopy(engine.strategy) for engine in vectorised] for _ in tickers],
+                                          [[engine._portfolio_snapshot(ticker, allocations[engine]) for engine in vectorised] for ticker in tickers])
+                    for ticker_results in results:
+                        for engine, result in zip(vectorised, ticker_results):
+                            engine._merge_result(*result)
+            elif thread_tasks:
+                with ThreadPoolExecutor(max_workers=min(len(thread_tasks), workers)) as threads:
+                    results = threads.map(_run_ticker, [ticker for _, ticker in thread_tasks],
+                                          [columns_by_ticker[ticker] for _, ticker in thread_tasks],
+                                          [copy.deepcopy(engine.strategy) for engine, _ in thread_tasks],
+                                          [engine._portfolio_snapshot(ticker, allocations[engine]) for engine, ticker in thread_tasks])
+                    for (engine, _), result in zip(thread_tasks, results):
+                        engine._merge_result(*result)
+            for (engine, _), future in zip(process_tasks, process_results):
+                engine._merge_result(*future.result())
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    finally:
+        for shm, _ in segments.values():
+            shm.close()
+            shm.unlink()
+
+    for engine in engines:
+        engine.portfolio.calculate_final_metrics()
+    return [engine.portfolio for engine in engines]
@@ -1,4 +1,5 @@
 import logging
+from enum import IntEnum
 
 def _setup_logger():
     logger = logging.getLogger('Orders')
@@ -11,15 +12,17 @@ def _setup_logger():
 
 logger = _setup_logger()
 
-class OrderType:
-    MARKET = 'MARKET'
-    LIMIT = 'LIMIT'
-    STOP = 'STOP'
+class OrderType(IntEnum):
+    # Integer codes so order matching compares ints (and orders can later be packed into typed arrays)
+    MARKET = 0
+    LIMIT = 1
+    STOP = 2
 
 class Order:
     """
     Basic representation of an order with type, price, quantity, etc.
     """
+    __slots__ = ('order_type', 'ticker', 'quantity', 'price', 'stop_price', 'filled')
 
     def __init__(self, order_type, ticker, quantity, price=None, stop_price=None): # Added price and stop_price
         self.order_type = order_type
@@ -28,12 +31,14 @@ class Order:
         self.price = price  # For limit orders: limit price, for stop orders: trigger price, for market orders: None
         self.stop_price = stop_price # For stop-loss orders, could be extended for more complex stop orders
         self.filled = False
-        log_message = f"Created {self.order_type} order for {self.quantity} shares of {self.ticker}"
-        if price is not None:
-            log_message += f" at price {self.price}"
-        if stop_price is not None:
-            log_message += f" with stop price {self.stop_price}"
-        logger.info(log_message + ".")
+        # Orders are created per signal, so the message is only built when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            log_message = f"Created {OrderType(self.order_type).name} order for {self.quantity} shares of {self.ticker}"
+            if price is not None:
+                log_message += f" at price {self.price}"
+            if stop_price is not None:
+                log_message += f" with stop price {self.stop_price}"
+            logger.debug(log_message + ".")
 
     def fill(self, fill_price):
         """
@@ -41,4 +46,4 @@ class Order:
         """
         self.filled = True
         self.price = fill_price # Update order price to fill price when filled
-        logger.info(f"Order for {self.ticker} filled at price {self.price}.")
\ No newline at end of file
+        logger.debug("Order for %s filled at price %s.", self.ticker, self.price)
\ No newline at end of file
@@ -1,42 +1,294 @@
 import logging
+import time
 from typing import Dict, Optional, List
 import pandas as pd
 from .Position import Position
 import numpy as np
-import random
 from .utils import risk_management
 from .Orders import Order, OrderType # Import Order and OrderType
+from ._kernels import _run_market_orders, _run_market_orders_batch
+
+def _setup_logger():
+    logger = logging.getLogger('Portfolio')
+    if not logger.handlers:
+        ch = logging.StreamHandler()
+        ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        logger.addHandler(ch)
+        logger.setLevel(logging.INFO)
+    return logger
+
+logger = _setup_logger() # Shared by every Portfolio (and worker snapshot) rather than looked up per instance
+
+# handle_signal takes Signal codes (1 BUY, -1 SELL, 0 HOLD) or the 'BUY' / 'SELL' / None spellings
+_SIGNAL_SIDES = {'BUY': 1, 'SELL': -1, None: 0}
 
 class Portfolio:
     """
     Holds multiple Positions, tracks account value, PnL, cash, etc.
     """
+    ORDER_QUANTITY = 10 # Shares per signal-driven order
+    # Trade history is kept as one preallocated array per field (grown by doubling) instead of a list of dicts
+    _HISTORY_FIELDS = {'timestamp': 'datetime64[ns]', 'ticker': object, 'quantity': np.int64, 'price': np.float64, 'execution_price': np.float64, 'cash': np.float64, 'portfolio_value': np.float64}
 
-    def __init__(self, initial_cash: float = 100_000, slippage_rate: float = 0.0025, max_drawdown: Optional[float] = None, volatility_threshold: Optional[float] = None, risk_free_rate: float = 0.02): # Added risk_free_rate
+    _SLIPPAGE_BLOCK = 4096 # Uniform draws generated per refill of the slippage buffer
+
+    def __init__(self, initial_cash: float = 100_000, slippage_rate: float = 0.0025, max_drawdown: Optional[float] = None, volatility_threshold: Optional[float] = None, risk_free_rate: float = 0.02, # Added risk_free_rate
+                 seed: Optional[int] = None):
         self.initial_cash = initial_cash
         self.cash = initial_cash
         self.positions: Dict[str, Position] = {}
-        self.history: List[dict] = []
-        self.portfolio_value_history: pd.Series = pd.Series()
-        self.trade_log: List[tuple] = []
+        # Positions mirrored as arrays (one row per ticker ever held) so total_value is a single dot product
+        self._pos_idx: Dict[str, int] = {}
+        self._pos_qty = np.zeros(16, dtype=np.float64)
+        self._pos_entry = np.zeros(16, dtype=np.float64)
+        self._last_price = np.full(16, np.nan)
+        self._holdings_value = 0.0 # Running market value of the position rows, kept in step by the helpers below
+        self._reset_history()
+        self._value_series: pd.Series = pd.Series() # Built on demand by portfolio_value_history
+        self._reset_trades()
         self.data_loader = None
-        self.logger = self._setup_logger()
+        self.logger = logger
         self.slippage_rate = slippage_rate
         self.max_drawdown = max_drawdown
         self.volatility_threshold = volatility_threshold
         self.risk_free_rate = risk_free_rate # Annual risk-free rate
+        self._reset_slippage(np.random.default_rng(seed))
         # New: Order management
         self.pending_orders: List[Order] = [] # List to hold pending orders
         self.logger.info(f"Portfolio initialized with initial_cash={self.initial_cash}, slippage_rate={self.slippage_rate}, max_drawdown={self.max_drawdown}, volatility_threshold={self.volatility_threshold}, risk_free_rate={self.risk_free_rate}")
 
-    def _setup_logger(self):
-        logger = logging.getLogger('Portfolio')
-        if not logger.handlers:
-            ch = logging.StreamHandler()
-            ch.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-            logger.addHandler(ch)
-            logger.setLevel(logging.INFO)
-        return logger
+    def _reset_slippage(self, rng: np.random.Generator):
+        """
+        Draw slippage from `rng`, discarding any buffered draws.
+        """
+        self._rng = rng
+        self._slip_buf = np.empty(0)
+        self._slip_i = 0
+
+    def _slippage_draws(self, n: int) -> np.ndarray:
+        """
+        Next n uniform(-1, 1) slippage draws, served from a buffer refilled in blocks rather than drawn one call at a time.
+        """
+        if self._slip_i + n > len(self._slip_buf):
+            # Carry the unused tail over, so the stream does not depend on how the draws were requested
+            left = self._slip_buf[self._slip_i:]
+            self._slip_buf = np.concatenate([left, self._rng.uniform(-1.0, 1.0, size=max(n - len(left), self._SLIPPAGE_BLOCK))])
+            self._slip_i = 0
+        draws = self._slip_buf[self._slip_i:self._slip_i + n]
+        self._slip_i += n
+        return draws
+
+    def _unread_slippage(self, n: int):
+        """
+        Give back the last n draws from _slippage_draws (reserved but not used), so the next orders get them.
+        """
+        self._slip_i -= n
+
+    def _reset_trades(self, capacity: int = 1024):
+        # Trade log as parallel typed arrays; tickers are stored as int32 codes into _ticker_names
+        self._ticker_codes: Dict[str, int] = {}
+        self._ticker_names: List[str] = []
+        self._tl_ticker = np.empty(capacity, dtype=np.int32)
+        self._tl_side = np.empty(capacity, dtype=np.int8) # 1 BUY, -1 SELL
+        self._tl_qty = np.empty(capacity, dtype=np.int64)
+        self._tl_px = np.empty(capacity, dtype=np.float64)
+        self._tl_exec = np.empty(capacity, dtype=np.float64)
+        self._tl_idx = np.empty(capacity, dtype=np.int64)
+        self._tl_n = 0
+
+    def _ticker_code(self, ticker: str) -> int:
+        code = self._ticker_codes.get(ticker)
+        if code is None:
+            code = self._ticker_codes[ticker] = len(self._ticker_names)
+            self._ticker_names.append(ticker)
+        return code
+
+    def _reserve_trades(self, extra: int):
+        """
+        Make room for `extra` more trades, doubling the arrays as often as needed.
+        """
+        needed = self._tl_n + extra
+        capacity = len(self._tl_side)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in ('_tl_ticker', '_tl_side', '_tl_qty', '_tl_px', '_tl_exec', '_tl_idx'):
+            values = getattr(self, name)
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self._tl_n] = values[:self._tl_n]
+            setattr(self, name, grown)
+
+    def _append_trade(self, ticker: str, side: str, quantity, price, execution_price, index):
+        self._reserve_trades(1)
+        n = self._tl_n
+        self._tl_ticker[n] = self._ticker_code(ticker)
+        self._tl_side[n] = 1 if side == 'BUY' else -1
+        self._tl_qty[n] = quantity
+        self._tl_px[n] = price
+        self._tl_exec[n] = execution_price
+        self._tl_idx[n] = index
+        self._tl_n = n + 1
+
+    def _extend_trades(self, ticker, sides: np.ndarray, quantities: np.ndarray, prices: np.ndarray, execution_prices: np.ndarray, indices: np.ndarray):
+        """
+        Bulk-append trades from arrays (as produced by the compiled order loops).
+        `ticker` is one symbol for every trade, or an array of per-trade ticker codes from _ticker_code.
+        """
+        k = len(sides)
+        self._reserve_trades(k)
+        n = self._tl_n
+        self._tl_ticker[n:n + k] = self._ticker_code(ticker) if isinstance(ticker, str) else ticker
+        self._tl_side[n:n + k] = sides
+        self._tl_qty[n:n + k] = quantities
+        self._tl_px[n:n + k] = prices
+        self._tl_exec[n:n + k] = execution_prices
+        self._tl_idx[n:n + k] = indices
+        self._tl_n = n + k
+
+    def trades_as_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        The trade log as column arrays (views, no copy): ticker, side (1 BUY / -1 SELL), quantity,
+        price, execution_price and index.
+        """
+        n = self._tl_n
+        return {
+            'ticker': np.array(self._ticker_names, dtype=object)[self._tl_ticker[:n]] if n else np.empty(0, dtype=object),
+            'side': self._tl_side[:n],
+            'quantity': self._tl_qty[:n],
+            'price': self._tl_px[:n],
+            'execution_price': self._tl_exec[:n],
+            'index': self._tl_idx[:n],
+        }
+
+    @property
+    def trade_log(self) -> List[tuple]:
+        """
+        Trades as (ticker, 'BUY'/'SELL', quantity, price, execution_price, index) tuples, built on access.
+        """
+        names = self._ticker_names
+        return [
+            (names[code], 'BUY' if side > 0 else 'SELL', quantity, price, execution_price, index)
+            for code, side, quantity, price, execution_price, index in zip(
+                self._tl_ticker[:self._tl_n].tolist(), self._tl_side[:self._tl_n].tolist(), self._tl_qty[:self._tl_n].tolist(),
+                self._tl_px[:self._tl_n].tolist(), self._tl_exec[:self._tl_n].tolist(), self._tl_idx[:self._tl_n].tolist())
+        ]
+
+    @trade_log.setter
+    def trade_log(self, trades: List[tuple]):
+        self._reset_trades(max(1024, len(trades)))
+        for trade in trades:
+            self._append_trade(*trade)
+
+    def _reset_history(self, capacity: int = 1024):
+        self._hist = {name: np.empty(capacity, dtype=dtype) for name, dtype in self._HISTORY_FIELDS.items()}
+        self._hist_n = 0
+        # Running statistics of portfolio_value, updated per recorded row, so drawdown checks read one float
+        self._peak_value = -np.inf
+        self._drawdown: Optional[float] = None # None until the first row
+        self._hist_built = -1 # Row count portfolio_value_history was last built from
+        self._metrics_cache = None # ((history length, risk-free rate), _return_metrics result)
+
+    def _record_history(self, timestamp, portfolio_value, ticker=None, quantity=0, price=np.nan, execution_price=np.nan, cash=np.nan):
+        """
+        Append one row to the history arrays, doubling their capacity when full.
+        """
+        n = self._hist_n
+        if n == len(self._hist['cash']):
+            for name, values in self._hist.items():
+                grown = np.empty(max(2 * n, 1), dtype=values.dtype)
+                grown[:n] = values
+                self._hist[name] = grown
+        row = self._hist
+        row['timestamp'][n] = timestamp
+        row['ticker'][n] = ticker
+        row['quantity'][n] = quantity
+        row['price'][n] = price
+        row['execution_price'][n] = execution_price
+        row['cash'][n] = cash
+        row['portfolio_value'][n] = portfolio_value
+        if portfolio_value > self._peak_value:
+            self._peak_value = portfolio_value
+        peak = self._peak_value
+        self._drawdown = (peak - portfolio_value) / peak if peak != 0 else 0
+        self._hist_n = n + 1
+
+    @property
+    def history(self) -> List[dict]:
+        """
+        Recorded trades as a list of dicts, materialised from the history arrays on access.
+        """
+        return self.get_historical_value().to_dict('records')
+
+    @history.setter
+    def history(self, rows: List[dict]):
+        self._reset_history(max(1024, len(rows)))
+        for row in rows:
+            self._record_history(**row)
+
+    def _position_row(self, ticker: str) -> int:
+        """
+        Row of `ticker` in the position arrays, allocating one (and growing the arrays) on first use.
+        """
+        row = self._pos_idx.get(ticker)
+        if row is None:
+            row = len(self._pos_idx)
+            if row == len(self._pos_qty):
+                self._pos_qty = np.concatenate([self._pos_qty, np.zeros(row)])
+                self._pos_entry = np.concatenate([self._pos_entry, np.zeros(row)])
+                self._last_price = np.concatenate([self._last_price, np.full(row, np.nan)])
+            self._pos_idx[ticker] = row
+        return row
+
+    def _row_value(self, row: int) -> float:
+        """
+        Market value of one position row: marked at the last price where known (as Position.market_value does), else at entry.
+        """
+        mark = self._last_price[row]
+        if mark != mark: # NaN (never marked) check without a function call
+            mark = self._pos_entry[row]
+        return float(self._pos_qty[row] * mark)
+
+    def _set_position(self, ticker: str, quantity, entry_price):
+        """
+        Sets (creating if needed) the Position for `ticker` and its row in the position arrays.
+        All position changes go through here or _drop_position so both views stay in sync.
+        """
+        position = self.positions.get(ticker)
+        if position is None:
+            self.positions[ticker] = Position(ticker=ticker, quantity=quantity, entry_price=entry_price)
+        else:
+            position.quantity = quantity
+            position.entry_price = entry_price
+        row = self._position_row(ticker)
+        self._holdings_value -= self._row_value(row)
+        self._pos_qty[row] = quantity
+        self._pos_entry[row] = entry_price
+        self._holdings_value += self._row_value(row)
+
+    def _drop_position(self, ticker: str):
+        """
+        Removes the Position for `ticker` and zeroes its row.
+        """
+        self.positions.pop(ticker, None)
+        row = self._pos_idx.get(ticker)
+        if row is not None:
+            self._holdings_value -= self._row_value(row)
+            self._pos_qty[row] = 0.0
+            self._pos_entry[row] = 0.0
+
+    def update_prices(self, prices: Dict[str, float]):
+        """
+        Marks held tickers to the given prices; total_value then values them at these instead of entry price.
+        """
+        for ticker, price in prices.items():
+            row = self._pos_idx.get(ticker)
+            if row is not None:
+                self._holdings_value -= self._row_value(row)
+                self._last_price[row] = price
+                self._holdings_value += self._row_value(row)
+                if ticker in self.positions:
+                    self.positions[ticker].current_price = price
 
     def set_data_loader(self, data_loader):
         """
@@ -49,21 +301,132 @@ class Portfolio:
         Takes a signal from the Engine and updates positions accordingly.
         Now accepts order_type and order prices.
         """
-        self.logger.info(f"Handling signal '{signal}' for ticker '{ticker}' at price {current_price}, order_type: {order_type}")
-        if signal == 'BUY':
+        self.logger.debug("Handling signal '%s' for ticker '%s' at price %s, order_type: %s", signal, ticker, current_price, order_type)
+        side = _SIGNAL_SIDES.get(signal, signal)
+        if order_type == OrderType.MARKET:
+            # Market orders execute immediately, so skip building an Order that would be discarded
+            if side == 1:
+                self._open_or_add_position(ticker, current_price, self.ORDER_QUANTITY, index)
+            elif side == -1:
+                self._close_or_reduce_position(ticker, current_price, self.ORDER_QUANTITY, index)
+            return
+        if side == 1:
             order_price = limit_price if order_type == OrderType.LIMIT else stop_price if order_type == OrderType.STOP else None # Determine order price based on order type
-            order = Order(order_type=order_type, ticker=ticker, quantity=10, price=order_price, stop_price=stop_price) # Create Order object, use order_price
-            if order_type == OrderType.MARKET:
-                self._execute_market_order(order, current_price, index) # Execute market order immediately
-            else:
-                self.pending_orders.append(order) # Add limit/stop order to pending orders
-        elif signal == 'SELL':
+            order = Order(order_type=order_type, ticker=ticker, quantity=self.ORDER_QUANTITY, price=order_price, stop_price=stop_price) # Create Order object, use order_price
+            self.pending_orders.append(order) # Add limit/stop order to pending orders
+        elif side == -1:
             order_price = limit_price if order_type == OrderType.LIMIT else stop_price if order_type == OrderType.STOP else None # Determine order price based on order type
-            order = Order(order_type=order_type, ticker=ticker, quantity=-10, price=order_price, stop_price=stop_price) # Negative quantity for sell, use order_price
-            if order_type == OrderType.MARKET:
-                self._execute_market_order(order, current_price, index) # Execute market order immediately
-            else:
-                self.pending_orders.append(order) # Add limit/stop order to pending orders
+            order = Order(order_type=order_type, ticker=ticker, quantity=-self.ORDER_QUANTITY, price=order_price, stop_price=stop_price) # Negative quantity for sell, use order_price
+            self.pending_orders.append(order) # Add limit/stop order to pending orders
+
+    def handle_signal_array(self, ticker: str, close: np.ndarray, signals: np.ndarray) -> int:
+        """
+        Executes a whole ticker's market-order signals (1 BUY, -1 SELL, 0 none; one per bar of close) in a
+        compiled loop. Equivalent to calling handle_signal on every signal bar with market orders.
+        Returns the number of executed trades.
+        """
+        # Drawdown only depends on the recorded history, which market orders do not extend, so check it once
+        if not risk_management(0, 1, drawdown=self._drawdown, max_drawdown=self.max_drawdown):
+            # Every order is refused, but handle_signal would still have priced the buys (and the sells, if holding)
+            position = self.positions.get(ticker)
+            priced = signals if position is not None and position.quantity > 0 else np.asarray(signals) > 0
+            self._slippage_draws(int(np.count_nonzero(priced)))
+            return 0
+
+        n_signals = int(np.count_nonzero(signals))
+        slippage = np.ascontiguousarray(self._slippage_draws(n_signals))
+        position = self.positions.get(ticker)
+        out_side = np.empty(n_signals, dtype=np.int8)
+        out_qty = np.empty(n_signals, dtype=np.int64)
+        out_exec = np.empty(n_signals, dtype=np.float64)
+        out_idx = np.empty(n_signals, dtype=np.int64)
+        n_trades, cash, qty, entry_price, has_position, used = _run_market_orders(
+            np.ascontiguousarray(close, dtype=np.float64),
+            np.ascontiguousarray(signals, dtype=np.int8),
+            slippage,
+            float(self.slippage_rate),
+            int(self.ORDER_QUANTITY),
+            float(self.cash),
+            int(position.quantity) if position else 0,
+            float(position.entry_price) if position else 0.0,
+            position is not None,
+            np.nan if self.volatility_threshold is None else float(self.volatility_threshold),
+            out_side, out_qty, out_exec, out_idx
+        )
+        self._unread_slippage(n_signals - used) # Sells with nothing held take no draw
+        if n_trades == 0:
+            return 0
+
+        # Replay the results into the Python-side state once
+        self._set_position(ticker, int(qty), float(entry_price))
+        self.cash = float(cash)
+        indices = out_idx[:n_trades]
+        self._extend_trades(ticker, out_side[:n_trades], out_qty[:n_trades], np.asarray(close, dtype=np.float64)[indices], out_exec[:n_trades], indices)
+        self.logger.info("Executed %d of %d signals for %s. Position: %d at %.4f, cash: %.2f", n_trades, n_signals, ticker, qty, entry_price, self.cash)
+        return n_trades
+
+    def handle_signal_batch(self, tickers, signals: np.ndarray, prices: np.ndarray, indices: np.ndarray) -> int:
+        """
+        Executes market-order signals for several tickers in one compiled call: tickers[i] gets signals[i]
+        (1 BUY, -1 SELL, 0 none) at prices[i] on bar indices[i]. Orders run in the given sequence against the
+        shared cash balance, as successive handle_signal calls would. Returns the number of executed trades.
+        """
+        signals = np.asarray(signals, dtype=np.int8)
+        if not risk_management(0, 1, drawdown=self._drawdown, max_drawdown=self.max_drawdown):
+            # Every order is refused, but handle_signal would still have priced the buys and the sells of held tickers
+            holding = {ticker for ticker, position in self.positions.items() if position.quantity > 0}
+            sells_held = np.array([ticker in holding for ticker in np.asarray(tickers, dtype=object)[signals < 0]], dtype=np.bool_)
+            self._slippage_draws(int(np.count_nonzero(signals > 0) + np.count_nonzero(sells_held)))
+            return 0
+
+        active = np.flatnonzero(signals)
+        if not len(active):
+            return 0
+        names, inverse = np.unique(np.asarray(tickers, dtype=object)[active], return_inverse=True)
+        name_rows = np.array([self._position_row(name) for name in names], dtype=np.int64) # May grow the position arrays
+        held = np.zeros(len(self._pos_qty), dtype=np.bool_)
+        held[[self._pos_idx[name] for name in self.positions]] = True
+        pos_qty = self._pos_qty.astype(np.int64)
+        pos_entry = self._pos_entry.copy()
+        n_signals = len(active)
+        out_k = np.empty(n_signals, dtype=np.int64)
+        out_qty = np.empty(n_signals, dtype=np.int64)
+        out_exec = np.empty(n_signals, dtype=np.float64)
+        prices = np.asarray(prices, dtype=np.float64)[active]
+        n_trades, cash, used = _run_market_orders_batch(
+            name_rows[inverse], signals[active], prices, np.ascontiguousarray(self._slippage_draws(n_signals)),
+            float(self.slippage_rate), int(self.ORDER_QUANTITY), float(self.cash), pos_qty, pos_entry, held,
+            np.nan if self.volatility_threshold is None else float(self.volatility_threshold),
+            out_k, out_qty, out_exec
+        )
+        self._unread_slippage(n_signals - used) # Sells of unheld tickers take no draw
+        if n_trades == 0:
+            return 0
+
+        # Replay the touched positions and the trades into the Python-side state once
+        for name, row in zip(names, name_rows):
+            if held[row]:
+                self._set_position(name, int(pos_qty[row]), float(pos_entry[row]))
+        self.cash = float(cash)
+        executed = out_k[:n_trades]
+        codes = np.array([self._ticker_code(name) for name in names], dtype=np.int32)[inverse[executed]]
+        self._extend_trades(codes, signals[active][executed], out_qty[:n_trades], prices[executed], out_exec[:n_trades],
+                            np.asarray(indices, dtype=np.int64)[active][executed])
+        self.logger.info("Executed %d of %d signals across %d tickers. Cash: %.2f", n_trades, n_signals, len(names), self.cash)
+        return n_trades
+
+    def handle_signal_matrix(self, tickers, close: np.ndarray, signals: np.ndarray) -> int:
+        """
+        Executes a (T, K) signal matrix aligned with a (T, K) close matrix, column k belonging to tickers[k].
+        Bars are walked in time order and, within a bar, in column order against the shared cash balance,
+        so the whole timestamp-by-ticker loop runs in one compiled call. Returns the number of executed trades.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        signals = np.asarray(signals, dtype=np.int8)
+        if close.shape != signals.shape or close.ndim != 2 or close.shape[1] != len(tickers):
+            raise ValueError(f"close {close.shape} and signals {signals.shape} must both be (T, {len(tickers)})")
+        t, k = np.nonzero(signals) # Row-major, i.e. time-major
+        return self.handle_signal_batch(np.asarray(tickers, dtype=object)[k], signals[t, k], close[t, k], t)
 
     def _execute_market_order(self, order: Order, current_price, index): # New method to execute market orders
         """
@@ -74,81 +437,75 @@ class Portfolio:
         elif order.quantity < 0: # Sell order
             self._close_or_reduce_position(order.ticker, current_price, abs(order.quantity), index) # Use abs for quantity to sell
 
-    def _apply_slippage(self, price, order_type):
+    def _apply_slippage(self, price, is_buy: bool):
         """
-        Applies slippage to the order price based on slippage rate and order type.
+        Applies symmetric slippage to the order price: price * (1 + slippage_rate * u), u ~ uniform(-1, 1).
+        Floored at zero in case slippage_rate exceeds 1.
         """
-        random_factor = random.uniform(-1, 1)
-        slippage_amount = price * self.slippage_rate * random_factor
-        execution_price = price + slippage_amount
+        random_factor = float(self._slippage_draws(1)[0])
+        execution_price = max(0.0, price * (1.0 + self.slippage_rate * random_factor))
 
-        if order_type == 'BUY':
-            execution_price = max(0, execution_price)
-        elif order_type == 'SELL':
-            execution_price = max(0, execution_price)
-
-        self.logger.debug(f"Slippage applied: Order Type: {order_type}, Base Price: {price}, Slippage Rate: {self.slippage_rate}, Random Factor: {random_factor:.4f}, Slippage Amount: {slippage_amount:.4f}, Execution Price: {execution_price:.4f}")
+        self.logger.debug("Slippage applied: Side: %s, Base Price: %s, Slippage Rate: %s, Random Factor: %.4f, Execution Price: %.4f", 'BUY' if is_buy else 'SELL', price, self.slippage_rate, random_factor, execution_price)
         return execution_price
 
     def _open_or_add_position(self, ticker, price, quantity, index): # Modified to accept quantity
         """
         Logic for opening or adding to a position. Now accepts quantity from order.
         """
-        execution_price = self._apply_slippage(price, 'BUY')
+        execution_price = self._apply_slippage(price, True)
         cost = execution_price * quantity
 
         # Risk Management Check before opening position
         if not risk_management(
             position_size=quantity,
             account_balance=self.cash,
-            portfolio_history=self.portfolio_value_history,
+            drawdown=self._drawdown,
             max_drawdown=self.max_drawdown,
             volatility_threshold=self.volatility_threshold,
             current_price=execution_price,
-            entry_price=self.positions.get(ticker, Position(ticker)).entry_price if ticker in self.positions else None
+            entry_price=self.positions[ticker].entry_price if ticker in self.positions else None
         ):
             return
 
         if cost > self.cash:
-            self.logger.info(f"Not enough cash to buy {quantity} shares of {ticker} at execution price {execution_price}.")
+            self.logger.debug("Not enough cash to buy %s shares of %s at execution price %s.", quantity, ticker, execution_price)
             return
 
         if ticker not in self.positions:
-            self.positions[ticker] = Position(ticker=ticker, quantity=0, entry_price=0)
-            self.logger.info(f"Opened new position for {ticker}.")
+            self.logger.debug("Opened new position for %s.", ticker)
+            existing_qty, existing_entry = 0, 0
+        else:
+            existing_qty, existing_entry = self.positions[ticker].quantity, self.positions[ticker].entry_price
 
         # Weighted average price if adding to existing position
-        existing_qty = self.positions[ticker].quantity
         new_qty = existing_qty + quantity
-        new_cost = (existing_qty * self.positions[ticker].entry_price) + cost
+        new_cost = (existing_qty * existing_entry) + cost
         avg_price = new_cost / new_qty
 
-        self.positions[ticker].quantity = new_qty
-        self.positions[ticker].entry_price = avg_price
+        self._set_position(ticker, new_qty, avg_price)
         self.cash -= cost
-        self.trade_log.append((ticker, 'BUY', quantity, price, execution_price, index))
+        self._append_trade(ticker, 'BUY', quantity, price, execution_price, index)
 
-        self.logger.info(f"Bought {quantity} shares of {ticker} at price {price}, execution price {execution_price}. "
-                         f"New quantity: {new_qty}, average price: {avg_price}")
-        self._update_portfolio_history()
+        self.logger.debug("Bought %s shares of %s at price %s, execution price %s. New quantity: %s, average price: %s",
+                          quantity, ticker, price, execution_price, new_qty, avg_price)
 
     def _close_or_reduce_position(self, ticker, price, quantity, index): # Modified to accept quantity
         """
         Logic for closing or reducing a position. Now accepts quantity from order.
         """
         if ticker not in self.positions or self.positions[ticker].quantity <= 0:
-            self.logger.info(f"No existing position in {ticker} to sell.")
+            self.logger.debug("No existing position in %s to sell.", ticker)
             return
 
         quantity_to_sell = min(self.positions[ticker].quantity, quantity) # Ensure not selling more than owned
-        execution_price = self._apply_slippage(price, 'SELL')
+        execution_price = self._apply_slippage(price, False)
         proceeds = execution_price * quantity_to_sell
 
         # Risk Management Check before closing position
         if not risk_management(
             position_size=quantity_to_sell,
             account_balance=self.cash + proceeds,
-            portfolio_history=self.portfolio_value_history,
+            drawdown=self._drawdown,
             max_drawdown=self.max_drawdown,
             volatility_threshold=self.volatility_threshold,
             current_price=execution_price,
@@ -157,93 +514,128 @@ class Portfolio:
             return
 
         self.cash += proceeds
-        self.trade_log.append((ticker, 'SELL', quantity_to_sell, price, execution_price, index))
+        self._append_trade(ticker, 'SELL', quantity_to_sell, price, execution_price, index)
 
-        self.logger.info(f"Sold {quantity_to_sell} shares of {ticker} at price {price}, execution price {execution_price}. "
-                         f"Cash += {proceeds}")
+        self.logger.debug("Sold %s shares of %s at price %s, execution price %s. Cash += %s",
+                          quantity_to_sell, ticker, price, execution_price, proceeds)
 
-        self.positions[ticker].quantity -= quantity_to_sell
-        if self.positions[ticker].quantity == 0:
-            self.positions[ticker].entry_price = 0
-            self.logger.info(f"Position for {ticker} closed.")
+        remaining = self.positions[ticker].quantity - quantity_to_sell
+        if remaining == 0:
+            self._set_position(ticker, 0, 0)
+            self.logger.debug("Position for %s closed.", ticker)
         else:
-            self.logger.info(f"Position for {ticker} reduced, remaining quantity: {self.positions[ticker].quantity}")
-        self._update_portfolio_history()
+            self._set_position(ticker, remaining, self.positions[ticker].entry_price)
+            self.logger.debug("Position for %s reduced, remaining quantity: %s", ticker, remaining)
 
-    def calculate_final_metrics(self):
+    def calculate_final_metrics(self) -> Optional[Dict[str, float]]:
         """
         Print out or return final portfolio metrics.
         """
         total_portfolio_value = self.total_value() # Use total_value method to get current portfolio value including positions
         pnl = total_portfolio_value - self.initial_cash
 
-        # Calculate portfolio returns
-        portfolio_values = pd.Series([item['portfolio_value'] for item in self.history])
-        if len(portfolio_values) < 2: # Need at least two points to calculate returns
-            self.logger.warning("Insufficient portfolio history to calculate metrics.")
-            return
+        warning, metrics = self._return_metrics()
+        if warning:
+            self.logger.warning(warning)
+            return None
 
-        portfolio_returns = portfolio_values.pct_change().dropna()
-        if portfolio_returns.empty:
-            self.logger.warning("No portfolio returns to calculate metrics.")
-            return
+        self.logger.info(f"Final Portfolio Value: {total_portfolio_value:.2f}")
+        self.logger.info(f"Total PnL: {pnl:.2f}")
+        self.logger.info(f"Annual Return: {metrics['annual_return']:.4f}")
+        self.logger.info(f"Sharpe Ratio: {metrics['sharpe_ratio']:.4f}")
+        self.logger.info(f"Sortino Ratio: {metrics['sortino_ratio']:.4f}")
+        self.logger.info(f"Maximum Drawdown: {metrics['max_drawdown']:.4f}")
+        self.logger.info(f"Calmar Ratio: {metrics['calmar_ratio']:.4f}")
+        return {'final_value': total_portfolio_value, 'pnl': pnl, **metrics}
+
+    def _return_metrics(self):
+        """
+        Return-based metrics over the recorded history as (warning, metrics); exactly one of the two is None.
+        Memoised on the history length and risk-free rate, since history is append-only between resets.
+        """
+        key = (self._hist_n, self.risk_free_rate)
+        if self._metrics_cache is not None and self._metrics_cache[0] == key:
+            return self._metrics_cache[1]
+
+        # Calculate portfolio returns (contiguous float64 reductions over the history array)
+        portfolio_values = self._hist['portfolio_value'][:self._hist_n]
+        if len(portfolio_values) < 2: # Need at least two points to calculate returns
+            result = ("Insufficient portfolio history to calculate metrics.", None)
+            self._metrics_cache = (key, result)
+            return result
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            portfolio_returns = np.diff(portfolio_values) / portfolio_values[:-1] # pct_change
+        portfolio_returns = portfolio_returns[~np.isnan(portfolio_returns)]
+        if not len(portfolio_returns):
+            result = ("No portfolio returns to calculate metrics.", None)
+            self._metrics_cache = (key, result)
+            return result
 
         # Annualize returns and risk-free rate (assuming daily data, adjust if needed)
         annualization_factor = 252 # Trading days in a year
         annual_return = portfolio_returns.mean() * annualization_factor
         excess_returns = portfolio_returns - (self.risk_free_rate / annualization_factor) # Daily excess returns
 
-        # Sharpe Ratio
-        sharpe_ratio = excess_returns.mean() / portfolio_returns.std() * np.sqrt(annualization_factor)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Sharpe Ratio (sample std, as pandas computes it)
+            return_std = portfolio_returns.std(ddof=1) if len(portfolio_returns) > 1 else np.nan
+            sharpe_ratio = excess_returns.mean() / return_std * np.sqrt(annualization_factor)
 
-        # Sortino Ratio (Downside deviation)
-        downside_returns = portfolio_returns[portfolio_returns < 0]
-        downside_deviation = downside_returns.std() * np.sqrt(annualization_factor) if not downside_returns.empty else np.nan
-        sortino_ratio = excess_returns.mean() / downside_deviation if downside_deviation else np.nan
+            # Sortino Ratio (Downside deviation)
+            downside_returns = portfolio_returns[portfolio_returns < 0]
+            downside_deviation = downside_returns.std(ddof=1) * np.sqrt(annualization_factor) if len(downside_returns) > 1 else np.nan
+            sortino_ratio = excess_returns.mean() / downside_deviation if downside_deviation else np.nan
 
-        # Maximum Drawdown
-        cumulative_returns = (1 + portfolio_returns).cumprod()
-        peak = cumulative_returns.cummax()
-        drawdown = (cumulative_returns - peak) / peak
-        max_drawdown_val = drawdown.min()
+            # Maximum Drawdown
+            cumulative_returns = np.cumprod(1 + portfolio_returns)
+            peak = np.maximum.accumulate(cumulative_returns)
+            drawdown = (cumulative_returns - peak) / peak
+            max_drawdown_val = drawdown.min()
 
         # Calmar Ratio
         max_drawdown_abs = abs(max_drawdown_val) if not pd.isna(max_drawdown_val) else np.nan
         calmar_ratio = annual_return / max_drawdown_abs if max_drawdown_abs != 0 and not pd.isna(max_drawdown_abs) else np.nan
 
-
-        self.logger.info(f"Final Portfolio Value: {total_portfolio_value:.2f}")
-        self.logger.info(f"Total PnL: {pnl:.2f}")
-        self.logger.info(f"Annual Return: {annual_return:.4f}")
-        self.logger.info(f"Sharpe Ratio: {sharpe_ratio:.4f}")
-        self.logger.info(f"Sortino Ratio: {sortino_ratio:.4f}")
-        self.logger.info(f"Maximum Drawdown: {max_drawdown_val:.4f}")
-        self.logger.info(f"Calmar Ratio: {calmar_ratio:.4f}")
+        metrics = {
+            'annual_return': float(annual_return),
+            'sharpe_ratio': float(sharpe_ratio),
+            'sortino_ratio': float(sortino_ratio),
+            'max_drawdown': float(max_drawdown_val),
+            'calmar_ratio': float(calmar_ratio),
+        }
+        self._metrics_cache = (key, (None, metrics))
+        return None, metrics
 
     def total_value(self) -> float:
         """Calculate total portfolio value."""
-        total = self.cash + sum(pos.market_value() for pos in self.positions.values())
-        self.logger.info(f"Total portfolio value calculated: {total}")
+        # O(1): the position helpers keep _holdings_value in step with every quantity, entry and price change
+        total = self.cash + self._holdings_value
+        self.logger.debug("Total portfolio value calculated: %s", total)
         return total
 
     def can_trade(self, ticker: str, quantity: int, price: float) -> bool:
         """Check if trade is possible given current cash."""
         cost = quantity * price
         can_trade = self.cash >= cost
-        self.logger.info(f"Can trade {'Yes' if can_trade else 'No'} for {quantity} shares of {ticker} at {price}.")
+        self.logger.debug("Can trade %s for %s shares of %s at %s.", 'Yes' if can_trade else 'No', quantity, ticker, price)
         return can_trade
 
-    def execute_trade(self, ticker: str, quantity: int, price: float, index: int, order_type=OrderType.MARKET, limit_price=None, stop_price=None) -> bool: # Added order_type, limit_price, stop_price
-        """Execute a trade (positive quantity for buy, negative for sell) with slippage and risk management."""
+    def execute_trade(self, ticker: str, quantity: int, price: float, index: int, order_type=OrderType.MARKET, limit_price=None, stop_price=None,
+                      timestamp: Optional[np.datetime64] = None) -> bool: # Added order_type, limit_price, stop_price
+        """
+        Execute a trade (positive quantity for buy, negative for sell) with slippage and risk management.
+        timestamp is the bar time recorded in history; the wall-clock time is used when it is not given.
+        """
         if quantity == 0:
-            self.logger.info("Trade aborted: Quantity is zero.")
+            self.logger.debug("Trade aborted: Quantity is zero.")
             return False
 
         if quantity > 0:
-            execution_price = self._apply_slippage(price, 'BUY')
+            execution_price = self._apply_slippage(price, True)
             trade_type = 'BUY'
         else:
-            execution_price = self._apply_slippage(price, 'SELL')
+            execution_price = self._apply_slippage(price, False)
             trade_type = 'SELL'
 
         cost = abs(quantity) * execution_price
@@ -252,73 +644,90 @@ class Portfolio:
         if not risk_management(
             position_size=abs(quantity),
             account_balance=self.cash if quantity > 0 else self.cash + cost,
-            portfolio_history=self.portfolio_value_history,
+            drawdown=self._drawdown,
             max_drawdown=self.max_drawdown,
             volatility_threshold=self.volatility_threshold,
             current_price=execution_price,
-            entry_price=self.positions.get(ticker, Position(ticker)).entry_price if ticker in self.positions and quantity > 0 else price
+            entry_price=self.positions[ticker].entry_price if ticker in self.positions and quantity > 0 else price
         ):
             return False
 
         if quantity > 0 and not self.can_trade(ticker, quantity, execution_price):
-            self.logger.info(f"Trade aborted: Not enough cash to buy {quantity} shares of {ticker} at execution price {execution_price}.")
+            self.logger.debug("Trade aborted: Not enough cash to buy %s shares of %s at execution price %s.", quantity, ticker, execution_price)
             return False
 
         if ticker not in self.positions:
-            self.positions[ticker] = Position(ticker=ticker)
-            self.logger.info(f"Opened new position for {ticker}.")
-
-        position = self.positions[ticker]
+            self.logger.debug("Opened new position for %s.", ticker)
+        existing_qty = self.positions[ticker].quantity if ticker in self.positions else 0
 
         # Update position
-        new_quantity = position.quantity + quantity
+        new_quantity = existing_qty + quantity
         if new_quantity == 0:
-            del self.positions[ticker]
-            self.logger.info(f"Position for {ticker} closed.")
+            self._drop_position(ticker)
+            self.logger.debug("Position for %s closed.", ticker)
         else:
-            position.quantity = new_quantity
-            position.entry_price = price  # Simplified - could use average price, but using original price for entry point
-            self.logger.info(f"Updated position for {ticker}: quantity={new_quantity}, entry_price={price}")
+            self._set_position(ticker, new_quantity, price)  # Simplified - could use average price, but using original price for entry point
+            self.logger.debug("Updated position for %s: quantity=%s, entry_price=%s", ticker, new_quantity, price)
 
         # Update cash
         self.cash -= cost if quantity > 0 else -cost
-        self.logger.info(f"Executed trade for {ticker} (Order Type: {order_type}): quantity={quantity}, price={price}, execution_price={execution_price}. New cash balance: {self.cash}")
+        self.logger.debug("Executed trade for %s (Order Type: %s): quantity=%s, price=%s, execution_price=%s. New cash balance: %s", ticker, order_type, quantity, price, execution_price, self.cash)
 
         # Record trade with execution_price in trade_log
-        self.trade_log.append((ticker, trade_type, quantity, price, execution_price, index))
-
-        # Record history with proper datetime
-        self.history.append({
-            'timestamp': pd.to_datetime('now'),
-            'ticker': ticker,
-            'quantity': quantity,
-            'price': price,
-            'execution_price': execution_price,
-            'cash': self.cash,
-            'portfolio_value': self.total_value()
-        })
-        self._update_portfolio_history()
+        self._append_trade(ticker, trade_type, quantity, price, execution_price, index)
+
+        # Record history (bar time, else wall-clock UTC execution time)
+        self._record_history(
+            timestamp=np.datetime64(time.time_ns(), 'ns') if timestamp is None else timestamp,
+            ticker=ticker,
+            quantity=quantity,
+            price=price,
+            execution_price=execution_price,
+            cash=self.cash,
+            portfolio_value=self.total_value()
+        )
 
         return True
 
     def get_historical_value(self) -> pd.DataFrame:
         """Get historical portfolio value as DataFrame."""
-        self.logger.info("Retrieving historical portfolio values.")
-        return pd.DataFrame(self.history)
+        self.logger.debug("Retrieving historical portfolio values.")
+        n = self._hist_n
+        return pd.DataFrame({name: values[:n] for name, values in self._hist.items()})
+
+    @property
+    def portfolio_value_history(self) -> pd.Series:
+        """Portfolio value over time, indexed by timestamp. Built from the history arrays on access."""
+        self._update_portfolio_history()
+        return self._value_series
 
     def _update_portfolio_history(self):
         """Updates the portfolio value history."""
-        historical_df = self.get_historical_value()
-        if not historical_df.empty:
-            self.portfolio_value_history = historical_df.set_index('timestamp')['portfolio_value']
+        n = self._hist_n
+        if n == self._hist_built:
+            return # Nothing recorded since the last rebuild
+        self._hist_built = n
+        if n:
+            # Zero-copy: recorded rows are never rewritten (growth allocates new arrays), so a read-only view is stable
+            values = self._hist['portfolio_value'][:n].view()
+            values.flags.writeable = False
+            self._value_series = pd.Series(
+                values,
+                index=pd.DatetimeIndex(self._hist['timestamp'][:n], name='timestamp'),
+                name='portfolio_value',
+                copy=False
+            )
         else:
-            self.portfolio_value_history = pd.Series()
+            self._value_series = pd.Series()
 
     def process_orders(self, current_time, current_prices): # Placeholder for order processing logic
         """
         Process pending orders (LIMIT, STOP). To be implemented.
         This would be called at each time step to check and execute pending orders.
         """
+        if not self.pending_orders:
+            return # Common case on every bar: nothing to match, so skip building the work lists
+
         orders_to_execute = []
         remaining_pending_orders = []
 
@@ -352,6 +761,6 @@ class Portfolio:
             execution_price = current_prices[order.ticker] # Use current price for execution
             self._execute_market_order(order, execution_price, -1) # Assuming index doesn't matter here, using -1
 
-        if orders_to_execute:
+        if orders_to_execute and self.logger.isEnabledFor(logging.DEBUG):
             executed_tickers = ", ".join([order.ticker for order in orders_to_execute])
-            self.logger.info(f"Processed and executed {len(orders_to_execute)} pending orders for tickers: {executed_tickers} at time {current_time}.")
\ No newline at end of file
+            self.logger.debug("Processed and executed %d pending orders for tickers: %s at time %s.", len(orders_to_execute), executed_tickers, current_time)
\ No newline at end of file
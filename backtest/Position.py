@@ -13,33 +13,27 @@ def _setup_logger():
 
 logger = _setup_logger()
 
-@dataclass
+@dataclass(slots=True)
 class Position:
     """Represents a position in a single asset."""
     ticker: str
     quantity: int = 0
     entry_price: float = 0.0
-    current_price: Optional[float] = None
-
-    def __post_init__(self):
-        logger.info(f"Position created for {self.ticker} with quantity={self.quantity} and entry_price={self.entry_price}")
+    current_price: Optional[float] = None # None until the position has been marked
 
     def market_value(self) -> float:
         """Calculate current market value of position."""
-        if self.current_price:
-            value = self.quantity * self.current_price
-        else:
-            value = self.quantity * self.entry_price
-        logger.info(f"Market value for {self.ticker}: {value}")
+        value = self.quantity * (self.current_price if self.current_price is not None else self.entry_price)
+        logger.debug("Market value for %s: %s", self.ticker, value)
         return value
 
     def unrealized_pnl(self) -> float:
         """Calculate unrealized profit/loss."""
-        if self.current_price:
+        if self.current_price is not None:
             return (self.current_price - self.entry_price) * self.quantity
         return 0.0
 
     def update_price(self, new_price: float):
         """Update current price."""
         self.current_price = new_price
-        logger.info(f"Updated price for {self.ticker} to {new_price}")
\ No newline at end of file
+        logger.debug("Updated price for %s to %s", self.ticker, new_price)
\ No newline at end of file
@@ -1,8 +1,14 @@
-from typing import Any, Optional
+from typing import Any, Dict, Optional
+from enum import IntEnum
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import os
 import logging
+import numpy as np
 import pandas as pd
 from sklearn.linear_model import LogisticRegression  # Example ML model
 from typing import List
+from ._kernels import _rolling_sma, _crossover_signals, _crossover_grid, _threshold_signals, _band_signals, _affine_into
 
 def _setup_logger():
     logger = logging.getLogger('Strategy')
@@ -15,23 +21,77 @@ def _setup_logger():
 
 logger = _setup_logger()
 
+class Signal(IntEnum):
+    # The same codes generate_signals arrays hold, so per-bar and vectorised signals compare as ints
+    SELL = -1
+    HOLD = 0
+    BUY = 1
+
+    def __str__(self):
+        return self.name
+
+def _previous(value) -> float:
+    """
+    The last value a strategy saw before this run, as the float the crossover kernels take (NaN when None).
+    """
+    return np.nan if value is None else float(value)
+
+def _codes(buy: np.ndarray, sell: np.ndarray) -> np.ndarray:
+    """
+    int8 Signal codes: BUY where buy, else SELL where sell, else HOLD.
+    """
+    return np.where(buy, Signal.BUY, np.where(sell, Signal.SELL, Signal.HOLD)).astype(np.int8)
+
 class Strategy:
     """
     Base Strategy class. Child classes should override generate_signal().
     """
+    # Bars of market_data['close_history'] the strategy reads per bar; None hands it the full history so far
+    required_lookback: Optional[int] = None
+    # Indicator specs (see utils.indicator_arrays) the Engine fills once per ticker when their columns are missing
+    required_indicators: tuple = ()
 
     def __init__(self, parameters: dict = None):
         self.parameters = parameters or {}
         logger.info(f"{self.__class__.__name__} initialized with parameters: {self.parameters}")
 
-    def generate_signal(self, ticker: str, market_data: Any) -> str:
+    def generate_signal(self, ticker: str, market_data: Any) -> Optional[Signal]:
         """
-        Return 'BUY', 'SELL', or None.
-        market_data can be a row of the DataFrame or other relevant info.
+        Return Signal.BUY, Signal.SELL, or None (Signal.HOLD also means no trade; 'BUY' / 'SELL' strings are still accepted).
+        The Engine passes {'close', 'close_history', 'idx', 'columns'}, where columns maps each column
+        name to the ticker's full array and idx is the current bar; {'close', 'df'} is also accepted.
+        close_history is a read-only view of the last required_lookback closes (all of them if None), ending at idx.
+        The Engine refills the same dict every bar, so copy out anything that must outlive the call.
         """
         # Example: Always return None, to be overridden by actual strategies.
         return None
 
+    def generate_signals(self, columns: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        """
+        Vectorised generate_signal over a whole ticker: an int8 array of Signal codes (1 BUY, -1 SELL, 0 HOLD),
+        leaving the strategy's state as if generate_signal had run on every bar.
+        Returning None (the default) makes the Engine call generate_signal bar by bar instead.
+        """
+        return None
+
+    @staticmethod
+    def _latest(market_data: Any, column: str):
+        """
+        Value of `column` at the current bar, from the Engine's column arrays or the last row of market_data['df'].
+        """
+        if 'columns' in market_data:
+            return market_data['columns'][column][market_data['idx']]
+        return market_data['df'][column].iloc[-1]
+
+    @staticmethod
+    def _has_column(market_data: Any, column: str) -> bool:
+        """
+        Whether market_data carries `column` (in the Engine's column arrays or market_data['df']).
+        """
+        if 'columns' in market_data:
+            return column in market_data['columns']
+        return column in market_data['df'].columns
+
 class SimpleMovingAverageStrategy(Strategy):
     """
     Example strategy that calculates short-term and long-term moving averages
@@ -43,53 +103,132 @@ class SimpleMovingAverageStrategy(Strategy):
         self.long_window = long_window
         self.previous_short_ma = None
         self.previous_long_ma = None
+        self.required_indicators = (('SMA', short_window), ('SMA', long_window))
+        # Windows without a precomputed SMA_<window> column are tracked with running sums over the latest closes
+        self._closes = deque(maxlen=max(short_window, long_window))
+        self._short_sum = 0.0
+        self._long_sum = 0.0
         logger.info(f"{self.__class__.__name__} created with short_window={self.short_window} and long_window={self.long_window}")
 
-    def generate_signal(self, ticker: str, market_data: Any) -> str:
+    def _update_running_means(self, close: float):
+        """
+        Push one close into the running sums (O(1)) and return the (short, long) means, NaN until a window is full.
+        """
+        closes = self._closes
+        if len(closes) >= self.short_window:
+            self._short_sum -= closes[-self.short_window]
+        if len(closes) >= self.long_window:
+            self._long_sum -= closes[-self.long_window]
+        closes.append(close)
+        self._short_sum += close
+        self._long_sum += close
+        short_ma = self._short_sum / self.short_window if len(closes) >= self.short_window else np.nan
+        long_ma = self._long_sum / self.long_window if len(closes) >= self.long_window else np.nan
+        return short_ma, long_ma
+
+    def _rolling_means(self, close: np.ndarray):
         """
-        Generate 'BUY' or 'SELL' signals based on moving average crossover.
+        Vectorised _update_running_means over a run of closes, continuing from (and then advancing) the running state.
+        """
+        history = np.concatenate([np.fromiter(self._closes, dtype=np.float64, count=len(self._closes)), close.astype(np.float64)])
+        short_ma = np.empty_like(history)
+        long_ma = np.empty_like(history)
+        _rolling_sma(history, self.short_window, short_ma)
+        _rolling_sma(history, self.long_window, long_ma)
+        self._closes.extend(history[-self._closes.maxlen:])
+        self._short_sum = float(np.sum(history[-self.short_window:]))
+        self._long_sum = float(np.sum(history[-self.long_window:]))
+        start = len(history) - len(close)
+        return short_ma[start:], long_ma[start:]
+
+    def generate_signal(self, ticker: str, market_data: Any) -> Optional[Signal]:
+        """
+        Generate Signal.BUY or Signal.SELL signals based on moving average crossover.
         """
         current_close = market_data['close']
-        df = market_data['df']  # Ensure 'df' is a pd.DataFrame
 
-        if not isinstance(df, pd.DataFrame):
-            logger.error(f"Market data for {ticker} is not a DataFrame.")
+        if 'columns' not in market_data and not isinstance(market_data.get('df'), pd.DataFrame):
+            logger.error("Market data for %s is not a DataFrame.", ticker)
             return None
 
-        short_ma = df['SMA_5'].iloc[-1]
-        long_ma = df['SMA_20'].iloc[-1]
+        short_column, long_column = f'SMA_{self.short_window}', f'SMA_{self.long_window}'
+        if self._has_column(market_data, short_column) and self._has_column(market_data, long_column):
+            short_ma = self._latest(market_data, short_column)
+            long_ma = self._latest(market_data, long_column)
+        else:
+            short_ma, long_ma = self._update_running_means(float(current_close))
 
         signal = None
 
         if self.previous_short_ma is not None and self.previous_long_ma is not None:
             if self.previous_short_ma <= self.previous_long_ma and short_ma > long_ma:
-                signal = 'BUY'
-                logger.info(f"BUY signal generated for {ticker} at price {current_close}.")
+                signal = Signal.BUY
+                logger.info("BUY signal generated for %s at price %s.", ticker, current_close)
             elif self.previous_short_ma >= self.previous_long_ma and short_ma < long_ma:
-                signal = 'SELL'
-                logger.info(f"SELL signal generated for {ticker} at price {current_close}.")
+                signal = Signal.SELL
+                logger.info("SELL signal generated for %s at price %s.", ticker, current_close)
 
         self.previous_short_ma = short_ma
         self.previous_long_ma = long_ma
 
         return signal
 
+    def generate_signals(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        short_column, long_column = f'SMA_{self.short_window}', f'SMA_{self.long_window}'
+        if short_column in columns and long_column in columns:
+            short_ma = columns[short_column].astype(np.float64, copy=False)
+            long_ma = columns[long_column].astype(np.float64, copy=False)
+        else:
+            short_ma, long_ma = self._rolling_means(columns['close'])
+        signals = _crossover_signals(short_ma, long_ma, _previous(self.previous_short_ma), _previous(self.previous_long_ma))
+        if len(short_ma):
+            self.previous_short_ma = short_ma[-1]
+            self.previous_long_ma = long_ma[-1]
+        return signals
+
+def sma_crossover_grid(close: np.ndarray, window_pairs: List[tuple], max_workers: Optional[int] = None) -> np.ndarray:
+    """
+    Signals of SimpleMovingAverageStrategy(short, long) for every (short, long) window pair over one close series:
+    an int8 (len(window_pairs), len(close)) array whose row k is what a fresh strategy's generate_signals({'close': close})
+    returns for pair k. Each distinct window's mean is computed once and shared by every pair using it, and the pairs
+    are scanned in chunks on up to max_workers threads (all cores by default) by a GIL-free kernel.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    windows = sorted({window for pair in window_pairs for window in pair})
+    row_of = {window: row for row, window in enumerate(windows)}
+    means = np.empty((len(windows), len(close)))
+    for window, row in row_of.items():
+        _rolling_sma(close, window, means[row])
+    fast_rows = np.array([row_of[short] for short, _ in window_pairs], dtype=np.int64)
+    slow_rows = np.array([row_of[long] for _, long in window_pairs], dtype=np.int64)
+    out = np.empty((len(window_pairs), len(close)), dtype=np.int8)
+
+    workers = max(1, min(len(window_pairs), max_workers or os.cpu_count() or 1))
+    bounds = np.linspace(0, len(window_pairs), workers + 1).astype(np.int64)
+    if workers == 1:
+        _crossover_grid(means, fast_rows, slow_rows, out)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda k: _crossover_grid(means, fast_rows[bounds[k]:bounds[k + 1]], slow_rows[bounds[k]:bounds[k + 1]],
+                                                        out[bounds[k]:bounds[k + 1]]), range(workers)))
+    return out
+
 class RSIStrategy(Strategy):
     """
     Strategy based on Relative Strength Index (RSI).
-    Generates 'BUY' signal when RSI crosses above rsi_low.
-    Generates 'SELL' signal when RSI crosses below rsi_high.
+    Generates Signal.BUY when RSI crosses above rsi_low.
+    Generates Signal.SELL when RSI crosses below rsi_high.
     """
     def __init__(self, rsi_low: int = 30, rsi_high: int = 70):
         super().__init__({'rsi_low': rsi_low, 'rsi_high': rsi_high})
         self.rsi_low = rsi_low
         self.rsi_high = rsi_high
         self.previous_rsi = None
+        self.required_indicators = (('RSI', 14),)
         logger.info(f"{self.__class__.__name__} created with rsi_low={self.rsi_low} and rsi_high={self.rsi_high}")
 
-    def generate_signal(self, ticker: str, market_data: Any) -> str:
-        df = market_data['df']
-        current_rsi = df['RSI'].iloc[-1]
+    def generate_signal(self, ticker: str, market_data: Any) -> Optional[Signal]:
+        current_rsi = self._latest(market_data, 'RSI')
         
         if self.previous_rsi is None:
             self.previous_rsi = current_rsi
@@ -97,20 +236,27 @@ class RSIStrategy(Strategy):
 
         signal = None
         if self.previous_rsi < self.rsi_low and current_rsi >= self.rsi_low:
-            signal = 'BUY'
-            logger.info(f"BUY signal generated for {ticker} based on RSI crossing above {self.rsi_low}.")
+            signal = Signal.BUY
+            logger.info("BUY signal generated for %s based on RSI crossing above %s.", ticker, self.rsi_low)
         elif self.previous_rsi > self.rsi_high and current_rsi <= self.rsi_high:
-            signal = 'SELL'
-            logger.info(f"SELL signal generated for {ticker} based on RSI crossing below {self.rsi_high}.")
+            signal = Signal.SELL
+            logger.info("SELL signal generated for %s based on RSI crossing below %s.", ticker, self.rsi_high)
 
         self.previous_rsi = current_rsi
         return signal
 
+    def generate_signals(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        rsi = columns['RSI'].astype(np.float64, copy=False)
+        signals = _threshold_signals(rsi, _previous(self.previous_rsi), float(self.rsi_low), float(self.rsi_high))
+        if len(rsi):
+            self.previous_rsi = rsi[-1]
+        return signals
+
 class MACDStrategy(Strategy):
     """
     Strategy based on Moving Average Convergence Divergence (MACD).
-    Generates 'BUY' signal when MACD crosses above the MACD signal line.
-    Generates 'SELL' signal when MACD crosses below the MACD signal line.
+    Generates Signal.BUY when MACD crosses above the MACD signal line.
+    Generates Signal.SELL when MACD crosses below the MACD signal line.
     """
     def __init__(self, fastperiod=12, slowperiod=26, signalperiod=9):
         super().__init__({'fastperiod': fastperiod, 'slowperiod': slowperiod, 'signalperiod': signalperiod})
@@ -119,12 +265,12 @@ class MACDStrategy(Strategy):
         self.signalperiod = signalperiod
         self.previous_macd = None
         self.previous_macd_signal = None
+        self.required_indicators = (('MACD', fastperiod, slowperiod, signalperiod),)
         logger.info(f"{self.__class__.__name__} created with fastperiod={self.fastperiod}, slowperiod={self.slowperiod}, signalperiod={self.signalperiod}")
 
-    def generate_signal(self, ticker: str, market_data: Any) -> str:
-        df = market_data['df']
-        current_macd = df['MACD'].iloc[-1]
-        current_macd_signal = df['MACD_Signal'].iloc[-1]
+    def generate_signal(self, ticker: str, market_data: Any) -> Optional[Signal]:
+        current_macd = self._latest(market_data, 'MACD')
+        current_macd_signal = self._latest(market_data, 'MACD_Signal')
 
         if self.previous_macd is None or self.previous_macd_signal is None:
             self.previous_macd = current_macd
@@ -133,21 +279,30 @@ class MACDStrategy(Strategy):
 
         signal = None
         if self.previous_macd <= self.previous_macd_signal and current_macd > current_macd_signal:
-            signal = 'BUY'
-            logger.info(f"BUY signal generated for {ticker} based on MACD crossover.")
+            signal = Signal.BUY
+            logger.info("BUY signal generated for %s based on MACD crossover.", ticker)
         elif self.previous_macd >= self.previous_macd_signal and current_macd < current_macd_signal:
-            signal = 'SELL'
-            logger.info(f"SELL signal generated for {ticker} based on MACD crossover.")
+            signal = Signal.SELL
+            logger.info("SELL signal generated for %s based on MACD crossover.", ticker)
 
         self.previous_macd = current_macd
         self.previous_macd_signal = current_macd_signal
         return signal
 
+    def generate_signals(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        macd = columns['MACD'].astype(np.float64, copy=False)
+        macd_signal = columns['MACD_Signal'].astype(np.float64, copy=False)
+        signals = _crossover_signals(macd, macd_signal, _previous(self.previous_macd), _previous(self.previous_macd_signal))
+        if len(macd):
+            self.previous_macd = macd[-1]
+            self.previous_macd_signal = macd_signal[-1]
+        return signals
+
 class BollingerBandsStrategy(Strategy):
     """
     Strategy based on Bollinger Bands.
-    Generates 'BUY' signal when price crosses below the lower band.
-    Generates 'SELL' signal when price crosses above the upper band.
+    Generates Signal.BUY when price crosses below the lower band.
+    Generates Signal.SELL when price crosses above the upper band.
     """
     def __init__(self, window=20, num_std=2):
         super().__init__({'window': window, 'num_std': num_std})
@@ -156,13 +311,13 @@ class BollingerBandsStrategy(Strategy):
         self.previous_close = None
         self.previous_bb_lower = None
         self.previous_bb_upper = None
+        self.required_indicators = (('BB', window, num_std),)
         logger.info(f"{self.__class__.__name__} created with window={self.window}, num_std={self.num_std}")
 
-    def generate_signal(self, ticker: str, market_data: Any) -> str:
-        df = market_data['df']
-        current_close = df['close'].iloc[-1]
-        current_bb_lower = df['BB_lower'].iloc[-1]
-        current_bb_upper = df['BB_upper'].iloc[-1]
+    def generate_signal(self, ticker: str, market_data: Any) -> Optional[Signal]:
+        current_close = market_data['close'] # The Engine hands the bar's close over directly
+        current_bb_lower = self._latest(market_data, 'BB_lower')
+        current_bb_upper = self._latest(market_data, 'BB_upper')
 
         if self.previous_close is None:
             self.previous_close = current_close
@@ -172,49 +327,92 @@ class BollingerBandsStrategy(Strategy):
 
         signal = None
         if self.previous_close >= self.previous_bb_lower and current_close < current_bb_lower:
-            signal = 'BUY'
-            logger.info(f"BUY signal generated for {ticker} based on price crossing below BB_lower.")
+            signal = Signal.BUY
+            logger.info("BUY signal generated for %s based on price crossing below BB_lower.", ticker)
         elif self.previous_close <= self.previous_bb_upper and current_close > current_bb_upper:
-            signal = 'SELL'
-            logger.info(f"SELL signal generated for {ticker} based on price crossing above BB_upper.")
+            signal = Signal.SELL
+            logger.info("SELL signal generated for %s based on price crossing above BB_upper.", ticker)
 
         self.previous_close = current_close
         self.previous_bb_lower = current_bb_lower
         self.previous_bb_upper = current_bb_upper
         return signal
 
+    def generate_signals(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        close = columns['close'].astype(np.float64, copy=False)
+        bb_lower = columns['BB_lower'].astype(np.float64, copy=False)
+        bb_upper = columns['BB_upper'].astype(np.float64, copy=False)
+        signals = _band_signals(close, bb_lower, bb_upper, _previous(self.previous_close),
+                                _previous(self.previous_bb_lower), _previous(self.previous_bb_upper))
+        if len(close):
+            self.previous_close = close[-1]
+            self.previous_bb_lower = bb_lower[-1]
+            self.previous_bb_upper = bb_upper[-1]
+        return signals
+
 class MLStrategy(Strategy):
     """
     Machine Learning Strategy - expects a pre-trained model to be passed during initialization.
+    Optionally takes the fitted StandardScaler / MinMaxScaler the model was trained behind; its transform is then
+    applied while the feature matrix is built, in one compiled pass per column.
     """
-    def __init__(self, model, feature_columns: List[str]): # Expects a pre-trained model and feature columns
+    def __init__(self, model, feature_columns: List[str], scaler=None): # Expects a pre-trained model and feature columns
         super().__init__()
         self.model = model # Now expects a pre-trained model to be passed
         self.feature_columns = feature_columns
+        self._scaling = None if scaler is None else self._affine_scaling(scaler, len(feature_columns))
         logger.info(f"{self.__class__.__name__} initialized with pre-trained model, using features: {self.feature_columns}")
         if not hasattr(model, 'predict_proba'):
             logger.error("Provided model does not have 'predict_proba' method. MLStrategy requires a model with probability predictions.")
             raise ValueError("Model must have 'predict_proba' method for MLStrategy.")
 
-    def generate_signal(self, ticker: str, market_data: Any) -> Optional[str]:
+    @staticmethod
+    def _affine_scaling(scaler, n_features: int):
+        """
+        A fitted scaler's transform as per-feature (scale, offset) arrays, so that x * scale + offset reproduces it.
+        """
+        if hasattr(scaler, 'min_'): # MinMaxScaler: x * scale_ + min_
+            return np.asarray(scaler.scale_, dtype=np.float64), np.asarray(scaler.min_, dtype=np.float64)
+        if hasattr(scaler, 'mean_') or hasattr(scaler, 'scale_'): # StandardScaler: (x - mean_) / scale_
+            mean = np.zeros(n_features) if getattr(scaler, 'mean_', None) is None else np.asarray(scaler.mean_, dtype=np.float64)
+            std = np.ones(n_features) if getattr(scaler, 'scale_', None) is None else np.asarray(scaler.scale_, dtype=np.float64)
+            return 1.0 / std, -mean / std
+        raise ValueError("scaler must be a fitted StandardScaler or MinMaxScaler.")
+
+    def _feature_frame(self, values: Dict[str, np.ndarray], n: int) -> pd.DataFrame:
         """
-        Generate 'BUY' or 'SELL' signals based on ML model prediction.
+        The model's input: one contiguous float32 (n, features) matrix, scaled on the way in when a scaler was given,
+        wrapped without a copy in a frame carrying the training column names.
+        """
+        matrix = np.empty((n, len(self.feature_columns)), dtype=np.float32)
+        for j, col in enumerate(self.feature_columns):
+            if self._scaling is None:
+                matrix[:, j] = values[col]
+            else:
+                _affine_into(np.asarray(values[col]), self._scaling[0][j], self._scaling[1][j], matrix[:, j])
+        return pd.DataFrame(matrix, columns=self.feature_columns, copy=False)
+
+    def generate_signal(self, ticker: str, market_data: Any) -> Optional[Signal]:
+        """
+        Generate Signal.BUY or Signal.SELL signals based on ML model prediction.
         Uses the pre-trained model passed during initialization.
 
         Important:
           1. Ensure the 'model' passed is a PRE-TRAINED model.
           2. Features used for training MUST be the same as 'feature_columns'.
-          3. Feature scaling used during training MUST be applied to 'market_data' here.
+          3. Feature scaling used during training MUST be applied to 'market_data' here, or passed as `scaler`.
+          4. Features are handed to the model as float32, so it should be trained on float32 features too.
         """
-        df = market_data['df']
+        available = market_data['columns'] if 'columns' in market_data else market_data['df'].columns
 
         # Check if feature columns are available in market data
         for col in self.feature_columns:
-            if col not in df.columns:
-                logger.warning(f"Feature column '{col}' missing in market data for {ticker}. ML strategy cannot generate signal.")
+            if col not in available:
+                logger.warning("Feature column '%s' missing in market data for %s. ML strategy cannot generate signal.", col, ticker)
                 return None
 
-        features = df[self.feature_columns].iloc[[-1]] # Get the latest row's features
+        # Get the latest row's features (as a one-row frame so the model sees its training column names)
+        features = self._feature_frame({col: np.array([self._latest(market_data, col)]) for col in self.feature_columns}, 1)
 
         try:
             prediction_proba = self.model.predict_proba(features) # Get probabilities
@@ -222,17 +420,43 @@ class MLStrategy(Strategy):
             buy_probability = prediction_proba[0][1]
 
             if buy_probability > 0.6: # Example threshold - adjust as needed
-                signal = 'BUY'
-                logger.info(f"ML Strategy: BUY signal generated for {ticker} with probability {buy_probability:.2f}.")
+                signal = Signal.BUY
+                logger.info("ML Strategy: BUY signal generated for %s with probability %.2f.", ticker, buy_probability)
             elif buy_probability < 0.4: # Example threshold for SELL
-                signal = 'SELL'
-                logger.info(f"ML Strategy: SELL signal generated for {ticker} with probability {buy_probability:.2f}.")
+                signal = Signal.SELL
+                logger.info("ML Strategy: SELL signal generated for %s with probability %.2f.", ticker, buy_probability)
             else:
                 signal = None # Neutral signal if probability is within the threshold
-                logger.info(f"ML Strategy: Neutral signal generated for {ticker} with probability {buy_probability:.2f}.")
+                logger.info("ML Strategy: Neutral signal generated for %s with probability %.2f.", ticker, buy_probability)
 
         except Exception as e:
-            logger.error(f"Error during model prediction for {ticker}: {e}. No signal generated.")
+            logger.error("Error during model prediction for %s: %s. No signal generated.", ticker, e)
             return None
 
-        return signal
\ No newline at end of file
+        return signal
+
+    def generate_signals(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        One predict_proba call over every bar instead of one per bar. Bars the model rejects (e.g. NaN warm-up rows)
+        get no signal, as a failed per-bar prediction would.
+        """
+        signals = np.zeros(len(columns['close']), dtype=np.int8)
+        missing = [col for col in self.feature_columns if col not in columns]
+        if missing:
+            logger.warning("Feature columns %s missing in market data. ML strategy cannot generate signals.", missing)
+            return signals
+        # float32 halves the feature matrix the model streams through
+        features = self._feature_frame(columns, len(columns['close']))
+        rows = np.arange(len(features))
+        try:
+            buy_probability = self.model.predict_proba(features)[:, 1]
+        except Exception:
+            # Retry on the fully populated rows only; the rest stay neutral
+            rows = np.flatnonzero(np.isfinite(features.to_numpy(dtype=np.float64)).all(axis=1))
+            try:
+                buy_probability = self.model.predict_proba(features.iloc[rows])[:, 1] if len(rows) else np.empty(0)
+            except Exception as e:
+                logger.error("Error during model prediction: %s. No signals generated.", e)
+                return signals
+        signals[rows] = _codes(buy_probability > 0.6, buy_probability < 0.4)
+        return signals
\ No newline at end of file
@@ -1,9 +1,9 @@
 """Initialization of the Python backtesting package."""
 
-from .DataLoader import DataLoader
-from .Strategy import Strategy, SimpleMovingAverageStrategy, RSIStrategy, MACDStrategy, BollingerBandsStrategy
+from .DataLoader import DataLoader, TickerSOA, MarketSOA
+from .Strategy import Strategy, SimpleMovingAverageStrategy, RSIStrategy, MACDStrategy, BollingerBandsStrategy, Signal, sma_crossover_grid
 from .Portfolio import Portfolio
-from .Engine import Engine
+from .Engine import Engine, run_strategies
 from .Orders import Order, OrderType
 from .Position import Position
 from .utils import risk_management  # Example usage
@@ -23,13 +23,18 @@ data_loader = DataLoader()
 
 __all__ = [
     'DataLoader',
+    'TickerSOA',
+    'MarketSOA',
     'Strategy',
     'SimpleMovingAverageStrategy',
     'RSIStrategy',
     'MACDStrategy',
     'BollingerBandsStrategy',
+    'Signal',
+    'sma_crossover_grid',
     'Portfolio',
     'Engine',
+    'run_strategies',
     'Order',
     'OrderType',
     'Position',
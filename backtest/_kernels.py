@@ -0,0 +1,329 @@
+import math
+import numpy as np
+from numba import njit, types
+
+# fastmath flags without 'nnan'/'ninf' so the NaN checks in the kernels survive optimisation;
+# error_model='numpy' makes x/0 give inf/nan like pandas instead of raising ZeroDivisionError
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+def _rolling_sma(x, w, out):
+    """
+    Rolling mean over a window of w values using a running sum (O(N)).
+    Windows that are not yet full or contain a NaN are written as NaN, matching pandas' rolling().mean().
+    """
+    s = 0.0
+    nan_count = 0
+    for i in range(x.shape[0]):
+        v = x[i]
+        if math.isnan(v):
+            nan_count += 1
+        else:
+            s += v
+        if i >= w:
+            old = x[i - w]
+            if math.isnan(old):
+                nan_count -= 1
+            else:
+                s -= old
+        if i >= w - 1 and nan_count == 0:
+            out[i] = s / w
+        else:
+            out[i] = np.nan
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+def _rolling_std_welford(x, w, out):
+    """
+    Rolling sample standard deviation (ddof=1) over a window of w values.
+    Uses Welford's recurrence with the add/remove update for the sliding window.
+    Windows holding a NaN or inf are written as NaN (an inf would otherwise poison the running moments).
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    nan_count = 0
+    for i in range(x.shape[0]):
+        v = x[i]
+        if math.isnan(v) or math.isinf(v):
+            nan_count += 1
+        else:
+            n += 1
+            delta = v - mean
+            mean += delta / n
+            m2 += delta * (v - mean)
+        if i >= w:
+            old = x[i - w]
+            if math.isnan(old) or math.isinf(old):
+                nan_count -= 1
+            else:
+                n -= 1
+                if n == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / n
+                    m2 -= delta * (old - mean)
+        if i >= w - 1 and nan_count == 0 and n > 1:
+            out[i] = math.sqrt(m2 / (n - 1)) if m2 > 0.0 else 0.0
+        else:
+            out[i] = np.nan
+
+@njit(cache=True, fastmath=_FASTMATH, error_model='numpy')
+def _returns_and_vol(close, w, returns_out, vol_out):
+    """
+    Fused single pass computing simple returns (as pct_change) and their rolling sample std over w values.
+    The window's oldest return is re-read from returns_out, so no separate history buffer is needed.
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    nan_count = 0
+    for i in range(close.shape[0]):
+        r = close[i] / close[i - 1] - 1.0 if i > 0 else np.nan
+        returns_out[i] = r
+        if math.isnan(r) or math.isinf(r):
+            nan_count += 1
+        else:
+            n += 1
+            delta = r - mean
+            mean += delta / n
+            m2 += delta * (r - mean)
+        if i >= w:
+            old = returns_out[i - w]
+            if math.isnan(old) or math.isinf(old):
+                nan_count -= 1
+            else:
+                n -= 1
+                if n == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = old - mean
+                    mean -= delta / n
+                    m2 -= delta * (old - mean)
+        if i >= w - 1 and nan_count == 0 and n > 1:
+            vol_out[i] = math.sqrt(m2 / (n - 1)) if m2 > 0.0 else 0.0
+        else:
+            vol_out[i] = np.nan
+
+@njit(cache=True, nogil=True)
+def _ffill_bfill(a):
+    """
+    In-place forward fill then backward fill of each row of a 2-D (columns x rows) array, one pass per column.
+    After the forward fill only a leading NaN run can remain, so the backward fill just copies the first valid value.
+    Returns (filled_any, nan_left) flags. Releases the GIL so the per-file reader threads can fill concurrently.
+    """
+    k, n = a.shape
+    filled = np.zeros(k, dtype=np.bool_)
+    left = np.zeros(k, dtype=np.bool_)
+    for j in range(k):
+        last = np.nan
+        first_valid = -1
+        for i in range(n):
+            v = a[j, i]
+            if math.isnan(v):
+                a[j, i] = last
+                filled[j] = True
+            else:
+                if first_valid < 0:
+                    first_valid = i
+                last = v
+        if first_valid < 0:
+            left[j] = n > 0
+        else:
+            for i in range(first_valid):
+                a[j, i] = a[j, first_valid]
+    return filled.any(), left.any()
+
+@njit(cache=True, nogil=True, fastmath=_FASTMATH)
+def _crossover_signals(fast, slow, prev_fast, prev_slow):
+    """
+    int8 codes for one line crossing another: 1 where fast moves from <= slow to above it, -1 where it moves
+    from >= slow to below it, else 0. prev_fast / prev_slow are the values before the first bar (NaN for none).
+    """
+    out = np.zeros(fast.shape[0], dtype=np.int8)
+    for i in range(fast.shape[0]):
+        f = fast[i]
+        s = slow[i]
+        if prev_fast <= prev_slow and f > s:
+            out[i] = 1
+        elif prev_fast >= prev_slow and f < s:
+            out[i] = -1
+        prev_fast = f
+        prev_slow = s
+    return out
+
+@njit(cache=True, nogil=True, fastmath=_FASTMATH)
+def _crossover_grid(means, fast_rows, slow_rows, out):
+    """
+    _crossover_signals for many line pairs at once: row k of out gets the crossovers of means[fast_rows[k]]
+    over means[slow_rows[k]], with no previous values. Releases the GIL so chunks of pairs can run on threads.
+    """
+    for k in range(fast_rows.shape[0]):
+        out[k] = _crossover_signals(means[fast_rows[k]], means[slow_rows[k]], np.nan, np.nan)
+
+@njit(cache=True, nogil=True, fastmath=_FASTMATH)
+def _affine_into(x, scale, offset, out):
+    """
+    out[i] = x[i] * scale + offset: one feature column through a fitted scaler's transform, written straight
+    into out (e.g. a float32 column of the model's feature matrix) with no temporaries.
+    """
+    for i in range(x.shape[0]):
+        out[i] = x[i] * scale + offset
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _threshold_signals(x, prev, low, high):
+    """
+    int8 codes for x crossing fixed levels: 1 where it rises from below low to low or above, -1 where it falls
+    from above high to high or below, else 0. prev is the value before the first bar (NaN for none).
+    """
+    out = np.zeros(x.shape[0], dtype=np.int8)
+    for i in range(x.shape[0]):
+        v = x[i]
+        if prev < low and v >= low:
+            out[i] = 1
+        elif prev > high and v <= high:
+            out[i] = -1
+        prev = v
+    return out
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _band_signals(close, lower, upper, prev_close, prev_lower, prev_upper):
+    """
+    int8 codes for close leaving a band: 1 where it drops from >= lower to below it, -1 where it rises
+    from <= upper to above it, else 0. The prev_* arguments are the values before the first bar (NaN for none).
+    """
+    out = np.zeros(close.shape[0], dtype=np.int8)
+    for i in range(close.shape[0]):
+        c = close[i]
+        lo = lower[i]
+        hi = upper[i]
+        if prev_close >= prev_lower and c < lo:
+            out[i] = 1
+        elif prev_close <= prev_upper and c > hi:
+            out[i] = -1
+        prev_close = c
+        prev_lower = lo
+        prev_upper = hi
+    return out
+
+# Explicit signatures: compiled (or loaded from the on-disk cache) at import instead of on the first backtest.
+# close comes either writable or as a read-only view of the Engine's cached columns, so both are listed.
+def _market_orders_sig(close_type):
+    return types.Tuple((types.int64, types.float64, types.int64, types.float64, types.boolean, types.int64))(
+        close_type, types.int8[::1], types.float64[::1], types.float64, types.int64, types.float64, types.int64,
+        types.float64, types.boolean, types.float64, types.int8[::1], types.int64[::1], types.float64[::1], types.int64[::1])
+
+_RUN_MARKET_ORDERS_SIGS = [
+    _market_orders_sig(types.float64[::1]),
+    _market_orders_sig(types.Array(types.float64, 1, 'C', readonly=True)),
+]
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _market_order_step(side, price, draw, slippage_rate, order_qty, cash, qty, entry_price, has_position, volatility_threshold):
+    """
+    One market order (side 1 buy, -1 sell) against one position, mirroring Portfolio._open_or_add_position /
+    _close_or_reduce_position and the per-trade risk checks. draw is the order's uniform(-1, 1) slippage draw.
+    Returns (traded, execution_price, cash, qty, entry_price, has_position); traded is 0 when the order is rejected.
+    """
+    # Both sides share one path: slippage is symmetric, so the execution price does not depend on the side, and
+    # the side only enters as a +/-1 factor on quantity and cash. The checks below all reject the same way.
+    buy = side > 0
+    sgn = 1 if buy else -1
+    execution_price = max(0.0, price * (1.0 + slippage_rate * draw))
+    traded = order_qty if buy else min(max(qty, 0), order_qty)
+    notional = execution_price * traded
+    cash_after = cash - sgn * notional
+    rejected = traded == 0 or traded * 2.0 > (cash if buy else cash_after) or (buy and cash_after < 0.0)
+    if not math.isnan(volatility_threshold) and (has_position or not buy) and entry_price != 0.0:
+        rejected = rejected or abs(execution_price - entry_price) / entry_price > volatility_threshold
+    if rejected:
+        return 0, execution_price, cash, qty, entry_price, has_position
+    new_qty = qty + sgn * traded
+    if buy:
+        entry_price = (qty * entry_price + notional) / new_qty
+    elif new_qty == 0:
+        entry_price = 0.0
+    return traded, execution_price, cash_after, new_qty, entry_price, has_position or buy
+
+@njit(_RUN_MARKET_ORDERS_SIGS, cache=True, nogil=True, error_model='numpy')
+def _run_market_orders(close, signals, slippage, slippage_rate, order_qty, cash, qty, entry_price, has_position,
+                       volatility_threshold, out_side, out_qty, out_exec, out_idx):
+    """
+    Replays market-order signals (1 buy, -1 sell, 0 none) against one position through _market_order_step.
+    slippage holds uniform(-1, 1) draws, at least one per signal bar; volatility_threshold is NaN when disabled.
+    A draw is only used by orders that get priced: like Portfolio._close_or_reduce_position, a sell with nothing
+    held is dropped before slippage is applied, so seeded runs match successive handle_signal calls.
+    Executed trades are written to the out_* arrays.
+    Returns (n_trades, cash, qty, entry_price, has_position, draws used). Releases the GIL so tickers can run on threads.
+    """
+    n_trades = 0
+    k = 0
+    for i in range(close.shape[0]):
+        side = signals[i]
+        if side == 0 or (side < 0 and qty <= 0):
+            continue
+        traded, execution_price, cash, qty, entry_price, has_position = _market_order_step(
+            side, close[i], slippage[k], slippage_rate, order_qty, cash, qty, entry_price, has_position, volatility_threshold)
+        k += 1
+        if traded == 0:
+            continue
+        out_side[n_trades] = side
+        out_qty[n_trades] = traded
+        out_exec[n_trades] = execution_price
+        out_idx[n_trades] = i
+        n_trades += 1
+    return n_trades, cash, qty, entry_price, has_position, k
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _run_market_orders_batch(rows, sides, prices, slippage, slippage_rate, order_qty, cash, pos_qty, pos_entry, held,
+                             volatility_threshold, out_k, out_qty, out_exec):
+    """
+    Replays a sequence of market orders across several positions (rows of pos_qty / pos_entry / held, updated in place)
+    against one shared cash balance, in order. sides are 1 buy / -1 sell; slippage holds at least one draw per order,
+    used (as in _run_market_orders) only by orders that get priced, so sells of unheld rows take none.
+    Executed orders are written as (order number, quantity, execution price) to the out_* arrays.
+    Returns (n_trades, cash, draws used).
+    """
+    n_trades = 0
+    d = 0
+    for k in range(rows.shape[0]):
+        row = rows[k]
+        if sides[k] < 0 and pos_qty[row] <= 0:
+            continue
+        traded, execution_price, cash, pos_qty[row], pos_entry[row], held[row] = _market_order_step(
+            sides[k], prices[k], slippage[d], slippage_rate, order_qty, cash, pos_qty[row], pos_entry[row], held[row],
+            volatility_threshold)
+        d += 1
+        if traded == 0:
+            continue
+        out_k[n_trades] = k
+        out_qty[n_trades] = traded
+        out_exec[n_trades] = execution_price
+        n_trades += 1
+    return n_trades, cash, d
+
+def warmup():
+    """
+    Compile (or load from the on-disk cache) every kernel once so the first real call is not billed the JIT.
+    """
+    x = np.arange(4, dtype=np.float64)
+    out = np.empty_like(x)
+    _rolling_sma(x, 2, out)
+    _rolling_std_welford(x, 2, out)
+    _returns_and_vol(x, 2, out, np.empty_like(x))
+    _ffill_bfill(np.array([[np.nan, 1.0]], dtype=np.float32))
+    _ffill_bfill(np.array([[np.nan, 1.0]]))
+    _crossover_signals(x, out, np.nan, np.nan)
+    _crossover_grid(np.stack([x, out]), np.zeros(1, dtype=np.int64), np.ones(1, dtype=np.int64), np.empty((1, 4), dtype=np.int8))
+    _threshold_signals(x, np.nan, 1.0, 2.0)
+    _affine_into(x, 2.0, 1.0, np.empty((4, 1), dtype=np.float32)[:, 0])
+    _affine_into(x.astype(np.float32), 2.0, 1.0, np.empty((4, 1), dtype=np.float32)[:, 0])
+    _band_signals(x, out, out, np.nan, np.nan, np.nan)
+    signals = np.array([1, 0, -1, 0], dtype=np.int8)
+    _run_market_orders(x + 1.0, signals, np.zeros(4), 0.0, 1, 100.0, 0, 0.0, False, np.nan,
+                       np.empty(4, dtype=np.int8), np.empty(4, dtype=np.int64), np.empty(4), np.empty(4, dtype=np.int64))
+    _run_market_orders_batch(np.zeros(2, dtype=np.int64), np.array([1, -1], dtype=np.int8), x[1:3], np.zeros(2), 0.0, 1, 100.0,
+                             np.zeros(1, dtype=np.int64), np.zeros(1), np.zeros(1, dtype=np.bool_), np.nan,
+                             np.empty(2, dtype=np.int64), np.empty(2, dtype=np.int64), np.empty(2))
@@ -1,5 +1,7 @@
 import logging
 import numpy as np
+import talib
+from ._kernels import _rolling_sma
 
 def _setup_logger():
     logger = logging.getLogger('Utils')
@@ -12,45 +14,115 @@ def _setup_logger():
 
 logger = _setup_logger()
 
-def risk_management(position_size, account_balance, portfolio_history=None, max_drawdown=None, volatility_threshold=None, current_price=None, entry_price=None):
+def risk_management(position_size, account_balance, portfolio_history=None, max_drawdown=None, volatility_threshold=None, current_price=None, entry_price=None, peak_value=None, drawdown=None):
     """
     Enhanced function for risk management incorporating drawdown and volatility checks.
 
     Args:
         position_size (float): Size of the position being considered (e.g., number of shares).
         account_balance (float): Current account balance.
-        portfolio_history (pd.Series, optional): Historical portfolio values over time. Required for drawdown calculation.
+        portfolio_history (pd.Series or np.ndarray, optional): Historical portfolio values over time. Required for drawdown calculation.
         max_drawdown (float, optional): Maximum acceptable drawdown as a percentage (e.g., 0.05 for 5%).
         volatility_threshold (float, optional): Threshold for volatility-based stop (e.g., standard deviation of returns).
         current_price (float, optional): Current price of the asset. Required for volatility-based stop if used.
         entry_price (float, optional): Entry price of the asset. Required for volatility-based stop if used.
+        peak_value (float, optional): Running maximum of portfolio_history, when the caller tracks it. Saves rescanning the history on every call.
+        drawdown (float, optional): Current drawdown, when the caller tracks it; portfolio_history and peak_value are then not needed.
 
     Returns:
         bool: True if trade is allowed, False otherwise.
     """
     if position_size * 2.0 > account_balance:
-        logger.info("Risk management: Position size too large relative to account balance, trade disallowed.")
+        logger.debug("Risk management: Position size too large relative to account balance, trade disallowed.")
         return False  # Disallow big trades
 
-    # Maximum Drawdown Check
-    if max_drawdown is not None and portfolio_history is not None and not portfolio_history.empty:
-        peak_value = np.max(portfolio_history)
-        current_value = portfolio_history.iloc[-1]
-        drawdown = (peak_value - current_value) / peak_value if peak_value != 0 else 0
-        if drawdown > max_drawdown:
-            logger.info(f"Risk management: Maximum drawdown ({drawdown:.2%}) exceeded limit ({max_drawdown:.2%}), trade disallowed.")
-            return False
-
     # Volatility-Based Stop (Example: Simple percentage stop based on entry price)
+    # Scalar arithmetic only, so it runs before the drawdown check, which may have to scan the history
     if volatility_threshold is not None and current_price is not None and entry_price is not None:
         price_change_percent = abs(current_price - entry_price) / entry_price if entry_price != 0 else 0
         if price_change_percent > volatility_threshold:
-            logger.info(f"Risk management: Price volatility ({price_change_percent:.2%}) exceeded threshold ({volatility_threshold:.2%}), trade disallowed.")
+            logger.debug("Risk management: Price volatility (%.2f%%) exceeded threshold (%.2f%%), trade disallowed.", price_change_percent * 100, volatility_threshold * 100)
+            return False
+
+    # Maximum Drawdown Check
+    if max_drawdown is not None:
+        if drawdown is None and portfolio_history is not None and len(portfolio_history):
+            values = np.asarray(portfolio_history) # No copy for a Series or ndarray
+            if peak_value is None:
+                peak_value = values.max()
+            current_value = values[-1]
+            drawdown = (peak_value - current_value) / peak_value if peak_value != 0 else 0
+        if drawdown is not None and drawdown > max_drawdown:
+            logger.debug("Risk management: Maximum drawdown (%.2f%%) exceeded limit (%.2f%%), trade disallowed.", drawdown * 100, max_drawdown * 100)
             return False
 
-    logger.info("Risk management: Trade allowed.")
+    logger.debug("Risk management: Trade allowed.")
     return True
 
+def _indicator_columns(spec) -> list:
+    """
+    Column names an indicator spec fills, as read by the strategies.
+    """
+    kind = spec[0]
+    if kind == 'SMA':
+        return [f'SMA_{spec[1]}']
+    if kind == 'RSI':
+        return ['RSI']
+    if kind == 'MACD':
+        return ['MACD', 'MACD_Signal']
+    if kind == 'BB':
+        return ['BB_upper', 'BB_middle', 'BB_lower']
+    raise ValueError(f"Unknown indicator spec: {spec}")
+
+def indicator_arrays(close, specs, present=()):
+    """
+    Compute the indicator columns named by `specs` straight from a close array, skipping specs whose columns are all in `present`.
+
+    Args:
+        close (np.ndarray): Close prices.
+        specs (iterable): Indicator specs such as ('SMA', 5), ('RSI', 14), ('MACD', 12, 26, 9) or ('BB', 20, 2).
+        present (collection, optional): Column names that already exist and need not be computed.
+
+    Returns:
+        dict: Column name -> float32 array (the precision get_features stores), for the missing specs only.
+    """
+    from .DataLoader import _cached_ta # Deferred: DataLoader pulls in the loader stack
+    missing = [spec for spec in specs if any(col not in present for col in _indicator_columns(spec))]
+    if not missing:
+        return {}
+
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    feat = {}
+    for spec in missing:
+        kind = spec[0]
+        if kind == 'SMA':
+            feat[f'SMA_{spec[1]}'] = np.empty_like(close)
+            _rolling_sma(close, spec[1], feat[f'SMA_{spec[1]}'])
+        elif kind == 'RSI':
+            feat['RSI'] = _cached_ta(close, talib.RSI, timeperiod=spec[1])
+        elif kind == 'MACD':
+            feat['MACD'], feat['MACD_Signal'], _ = _cached_ta(close, talib.MACD, fastperiod=spec[1], slowperiod=spec[2], signalperiod=spec[3])
+        else:
+            feat['BB_upper'], feat['BB_middle'], feat['BB_lower'] = _cached_ta(
+                close, talib.BBANDS, timeperiod=spec[1], nbdevup=spec[2], nbdevdn=spec[2], matype=0)
+    logger.debug("Precomputed indicator columns %s.", list(feat))
+    return {name: values.astype(np.float32) for name, values in feat.items()}
+
+def precompute_indicators(df, specs):
+    """
+    Fill the indicator columns named by `specs` once, ahead of the bar loop, so strategies only read them.
+
+    Args:
+        df (pd.DataFrame): Price frame with a 'close' column.
+        specs (iterable): Indicator specs, as for indicator_arrays.
+
+    Returns:
+        pd.DataFrame: df itself when every column is already present (e.g. from DataLoader.get_features),
+        otherwise a new frame with the missing columns added.
+    """
+    feat = indicator_arrays(df['close'].to_numpy(dtype=np.float64), specs, present=df.columns)
+    return df.assign(**feat) if feat else df
+
 def concurrency_example(data):
     """
     Placeholder function to demonstrate concurrency usage (multiprocessing/threading).
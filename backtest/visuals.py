@@ -1,8 +1,11 @@
 import matplotlib.pyplot as plt
 import logging
-from typing import Dict, List
+import os
+from typing import Dict, List, Optional
+import numpy as np
 import pandas as pd
 from .Portfolio import Portfolio
+from .Strategy import Signal
 
 def _setup_logger():
     logger = logging.getLogger('Visuals')
@@ -15,46 +18,75 @@ def _setup_logger():
 
 logger = _setup_logger()
 
-def plot_signals(df, signals):
+def _finish(fig, save_path: Optional[str] = None):
+    """
+    Save the figure to save_path and release it (headless runs and sweeps), or show it when no path is given.
+    """
+    if save_path:
+        fig.savefig(save_path, dpi=100)
+        plt.close(fig)
+    else:
+        plt.show()
+    return fig
+
+def plot_signals(df, signals, save_path: Optional[str] = None):
     """
     Plot the stock price and overlay buy/sell signals.
 
     df: DataFrame containing columns 'datetime' and 'close'
-    signals: list of (index, signal_type) or similar
+    signals: list of (index, signal_type) pairs, signal_type a Signal or 'BUY' / 'SELL', or an int8 array of Strategy.generate_signals codes
+             (1 BUY, -1 SELL, 0 none), one per row of df
+    save_path: write the figure there and close it instead of showing it
+    Returns the Figure.
     """
     logger.info("Plotting signals.")
-    plt.figure(figsize=(10, 6))
-    plt.plot(df['datetime'], df['close'], label='Price', color='blue')
-
-    for (idx, signal_type) in signals:
-        if signal_type == 'BUY':
-            plt.scatter(df.loc[idx, 'datetime'], df.loc[idx, 'close'], color='green', marker='^', s=100, label='BUY Signal')
-        elif signal_type == 'SELL':
-            plt.scatter(df.loc[idx, 'datetime'], df.loc[idx, 'close'], color='red', marker='v', s=100, label='SELL Signal')
-    plt.legend()
-    plt.title("Price With Buy/Sell Signals")
-    plt.xlabel("Datetime")
-    plt.ylabel("Price")
-    plt.grid(True)
-    plt.show()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    datetimes = df['datetime'].to_numpy()
+    closes = df['close'].to_numpy()
+    ax.plot(datetimes, closes, label='Price', color='blue')
+
+    # One scatter per signal type (one legend entry each) instead of one per signal
+    codes = signals if isinstance(signals, np.ndarray) else None
+    if codes is None:
+        # (label, type) pairs: map the labels to row positions once
+        signals = list(signals)
+        labels = [idx for idx, _ in signals]
+        # Kinds may be Signal values (or their int codes) or the 'BUY' / 'SELL' labels; compare them all as codes
+        kinds = np.array([Signal.__members__.get(kind, Signal.HOLD) if isinstance(kind, str) else int(kind) for _, kind in signals], dtype=np.int8)
+        rows = df.index.get_indexer(labels) if labels else np.empty(0, dtype=np.int64)
+    for code, signal_type, color, marker in ((1, 'BUY', 'green', '^'), (-1, 'SELL', 'red', 'v')):
+        if codes is not None:
+            selected = np.flatnonzero(codes == code)
+        else:
+            selected = rows[(kinds == code) & (rows >= 0)] # Drop labels not in df
+        if len(selected):
+            ax.scatter(datetimes[selected], closes[selected], color=color, marker=marker, s=100, label=f'{signal_type} Signal')
+    ax.legend()
+    ax.set_title("Price With Buy/Sell Signals")
+    ax.set_xlabel("Datetime")
+    ax.set_ylabel("Price")
+    ax.grid(True)
+    _finish(fig, save_path)
     logger.info("Finished plotting signals.")
+    return fig
 
-def plot_portfolio(portfolio_value_series):
+def plot_portfolio(portfolio_value_series, save_path: Optional[str] = None):
     """
-    Plot the portfolio value over time.
+    Plot the portfolio value over time. Returns the Figure; see plot_signals for save_path.
     """
     logger.info("Plotting portfolio value.")
-    plt.figure(figsize=(10, 4))
-    plt.plot(portfolio_value_series.index, portfolio_value_series.values, label='Portfolio Value', color='purple')
-    plt.legend()
-    plt.title("Portfolio Equity Curve")
-    plt.xlabel("Datetime")
-    plt.ylabel("Portfolio Value")
-    plt.grid(True)
-    plt.show()
+    fig, ax = plt.subplots(figsize=(10, 4))
+    ax.plot(portfolio_value_series.index, portfolio_value_series.values, label='Portfolio Value', color='purple')
+    ax.legend()
+    ax.set_title("Portfolio Equity Curve")
+    ax.set_xlabel("Datetime")
+    ax.set_ylabel("Portfolio Value")
+    ax.grid(True)
+    _finish(fig, save_path)
     logger.info("Finished plotting portfolio value.")
+    return fig
 
-def plot_strategy_results(portfolio: Portfolio, ticker: str, strategy_name: str):
+def plot_strategy_results(portfolio: Portfolio, ticker: str, strategy_name: str, save_path: Optional[str] = None):
     """
     Plot buy/sell signals and portfolio value for a specific strategy and ticker.
 
@@ -62,69 +94,77 @@ def plot_strategy_results(portfolio: Portfolio, ticker: str, strategy_name: str)
         portfolio (Portfolio): The portfolio instance containing trade logs.
         ticker (str): The stock ticker.
         strategy_name (str): Name of the strategy.
+        save_path (str, optional): Write the figure there and close it instead of showing it.
+
+    Returns:
+        Figure: The plotted figure.
     """
-    # Retrieve trade log for the specific ticker and strategy
-    trades = [trade for trade in portfolio.trade_log if trade[0] == ticker]
+    # Retrieve the ticker's trades from the trade log's column arrays (no per-trade tuples)
+    trades = portfolio.trades_as_arrays()
+    mine = trades['ticker'] == ticker
     df = portfolio.data_loader.data[ticker]
-
-    buy_signals = [trade for trade in trades if trade[1] == 'BUY']
-    sell_signals = [trade for trade in trades if trade[1] == 'SELL']
-
-    plt.figure(figsize=(14, 7))
-    plt.plot(df['datetime'], df['close'], label='Close Price', color='blue')
-
-    # Plot Buy signals
-    if buy_signals:
-        # Corrected line: Extract index from the last element of the trade log tuple (index is at position 5, index starts from 0)
-        buy_dates = [df['datetime'].iloc[trade[5]] for trade in buy_signals]
-        buy_prices = [df['close'].iloc[trade[5]] for trade in buy_signals]
-        plt.scatter(buy_dates, buy_prices, marker='^', color='green', label='BUY Signal', s=100)
-
-    # Plot Sell signals
-    if sell_signals:
-        # Corrected line: Extract index from the last element of the trade log tuple
-        sell_dates = [df['datetime'].iloc[trade[5]] for trade in sell_signals]
-        sell_prices = [df['close'].iloc[trade[5]] for trade in sell_signals]
-        plt.scatter(sell_dates, sell_prices, marker='v', color='red', label='SELL Signal', s=100)
-
-    plt.title(f"{ticker} Price with Buy/Sell Signals - {strategy_name}")
-    plt.xlabel("Datetime")
-    plt.ylabel("Price")
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-
-def plot_portfolio_over_time(portfolio: Portfolio, strategy_name: str):
+    datetimes = df['datetime'].to_numpy()
+    closes = df['close'].to_numpy()
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.plot(datetimes, closes, label='Close Price', color='blue')
+
+    # One scatter per side, fetching every trade's bar (its row position in df) at once
+    for side, signal_type, color, marker in ((1, 'BUY', 'green', '^'), (-1, 'SELL', 'red', 'v')):
+        rows = trades['index'][mine & (trades['side'] == side)]
+        if len(rows):
+            ax.scatter(datetimes[rows], closes[rows], marker=marker, color=color, label=f'{signal_type} Signal', s=100)
+
+    ax.set_title(f"{ticker} Price with Buy/Sell Signals - {strategy_name}")
+    ax.set_xlabel("Datetime")
+    ax.set_ylabel("Price")
+    ax.legend()
+    ax.grid(True)
+    return _finish(fig, save_path)
+
+def plot_portfolio_over_time(portfolio: Portfolio, strategy_name: str, save_path: Optional[str] = None):
     """
     Plot the portfolio value over time for a specific strategy.
 
     Args:
         portfolio (Portfolio): The portfolio instance containing historical values.
         strategy_name (str): Name of the strategy.
+        save_path (str, optional): Write the figure there and close it instead of showing it.
+
+    Returns:
+        Figure: The plotted figure, or None when there is no history.
     """
     historical = portfolio.get_historical_value()
     if historical.empty:
         logger.warning(f"No historical data to plot for {strategy_name}.")
-        return
-
-    plt.figure(figsize=(14, 7))
-    plt.plot(historical['timestamp'], historical['portfolio_value'], label='Portfolio Value', color='purple')
-    plt.title(f"Portfolio Equity Curve - {strategy_name}")
-    plt.xlabel("Datetime")
-    plt.ylabel("Portfolio Value")
-    plt.legend()
-    plt.grid(True)
-    plt.show()
-
-def plot_all_strategies_results(portfolios: Dict[str, Portfolio], tickers: List[str]):
+        return None
+
+    fig, ax = plt.subplots(figsize=(14, 7))
+    ax.plot(historical['timestamp'], historical['portfolio_value'], label='Portfolio Value', color='purple')
+    ax.set_title(f"Portfolio Equity Curve - {strategy_name}")
+    ax.set_xlabel("Datetime")
+    ax.set_ylabel("Portfolio Value")
+    ax.legend()
+    ax.grid(True)
+    return _finish(fig, save_path)
+
+def plot_all_strategies_results(portfolios: Dict[str, Portfolio], tickers: List[str], save_dir: Optional[str] = None):
     """
     Plot buy/sell signals and portfolio value for all strategies and tickers.
+    Each figure is closed once shown (or written to save_dir as <strategy>_<ticker>.png and
+    <strategy>_portfolio.png), so memory stays flat however many strategies and tickers there are.
 
     Args:
         portfolios (Dict[str, Portfolio]): Dictionary of portfolio instances keyed by strategy name.
         tickers (List[str]): List of stock tickers.
+        save_dir (str, optional): Directory to write the figures to instead of showing them.
     """
+    def path(name):
+        return os.path.join(save_dir, f"{name}.png") if save_dir else None
+
     for strategy_name, portfolio in portfolios.items():
         for ticker in tickers:
-            plot_strategy_results(portfolio, ticker, strategy_name)
-        plot_portfolio_over_time(portfolio, strategy_name)
\ No newline at end of file
+            plt.close(plot_strategy_results(portfolio, ticker, strategy_name, save_path=path(f"{strategy_name}_{ticker}")))
+        fig = plot_portfolio_over_time(portfolio, strategy_name, save_path=path(f"{strategy_name}_portfolio"))
+        if fig is not None:
+            plt.close(fig)
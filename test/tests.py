@@ -1,16 +1,23 @@
 import unittest
 import pandas as pd
 import numpy as np
-from backtest import DataLoader, SimpleMovingAverageStrategy, Portfolio, Engine
-from backtest import RSIStrategy, MACDStrategy, BollingerBandsStrategy
+from backtest import DataLoader, Strategy, SimpleMovingAverageStrategy, Portfolio, Engine
+from backtest import RSIStrategy, MACDStrategy, BollingerBandsStrategy, Signal
 from backtest.utils import risk_management
 from backtest.Orders import Order, OrderType # Import Order and OrderType for tests
 import io # Import io for testing CSV data
+import copy
 from unittest.mock import patch
 import matplotlib.pyplot as plt  # Import pyplot for visual tests
 from backtest.visuals import plot_signals, plot_portfolio, plot_strategy_results, plot_portfolio_over_time, plot_all_strategies_results # Import visual functions
 
 
+class AlwaysBuyStrategy(Strategy):
+    """Buys on every bar. Defined at module level so process-pool workers can unpickle it."""
+    def generate_signals(self, columns):
+        return np.ones(len(columns['close']), dtype=np.int8)
+
+
 class TestBacktestingFramework(unittest.TestCase):
     def setUp(self):
         np.random.seed(42)  # For reproducibility
@@ -124,7 +131,7 @@ class TestBacktestingFramework(unittest.TestCase):
             })
         }
         rsi_signal = self.strategies[1].generate_signal('AMD', rsi_market_data)
-        self.assertIn(rsi_signal, ['BUY', 'SELL', None])
+        self.assertIn(rsi_signal, [Signal.BUY, Signal.SELL, None])
 
         # Simulate market data for MACDStrategy
         macd_market_data = {
@@ -137,7 +144,7 @@ class TestBacktestingFramework(unittest.TestCase):
             })
         }
         macd_signal = self.strategies[2].generate_signal('NVDA', macd_market_data)
-        self.assertIn(macd_signal, ['BUY', 'SELL', None])
+        self.assertIn(macd_signal, [Signal.BUY, Signal.SELL, None])
 
         # Simulate market data for BollingerBandsStrategy
         bb_market_data = {
@@ -151,7 +158,7 @@ class TestBacktestingFramework(unittest.TestCase):
             })
         }
         bb_signal = self.strategies[3].generate_signal('AAPL', bb_market_data)
-        self.assertIn(bb_signal, ['BUY', 'SELL', None])
+        self.assertIn(bb_signal, [Signal.BUY, Signal.SELL, None])
 
     def test_risk_management_position_size(self):
         """
@@ -172,6 +179,8 @@ class TestBacktestingFramework(unittest.TestCase):
         self.assertTrue(allowed, "Trade should be allowed if drawdown is within limit.")
         disallowed = risk_management(position_size=100, account_balance=10000, portfolio_history=portfolio_history, max_drawdown=0.08)
         self.assertFalse(disallowed, "Trade should be disallowed if drawdown exceeds limit.")
+        self.assertTrue(risk_management(position_size=100, account_balance=10000, portfolio_history=portfolio_history, max_drawdown=0.08, peak_value=90000),
+                        "A caller-supplied running peak should replace the scan of portfolio_history.")
 
     def test_risk_management_volatility_stop(self):
         """
@@ -189,6 +198,8 @@ class TestBacktestingFramework(unittest.TestCase):
         portfolio = Portfolio(initial_cash=100000, max_drawdown=0.05)
         portfolio.history = [{'timestamp': pd.to_datetime('now'), 'portfolio_value': 100000}, {'timestamp': pd.to_datetime('now'), 'portfolio_value': 94000}]
         portfolio._update_portfolio_history()
+        self.assertEqual(portfolio._peak_value, 100000)
+        self.assertAlmostEqual(portfolio._drawdown, 0.06)
         initial_cash = portfolio.cash
         portfolio.execute_trade('AMD', 10, 100, 0)
         final_cash = portfolio.cash
@@ -204,6 +215,9 @@ class TestBacktestingFramework(unittest.TestCase):
         self.assertEqual(market_order.quantity, 10)
         self.assertIsNone(market_order.price)
         self.assertIsNone(market_order.stop_price)
+        # Order types are integer codes and orders carry no per-instance __dict__
+        self.assertEqual(int(OrderType.LIMIT), 1)
+        self.assertFalse(hasattr(market_order, '__dict__'))
 
     def test_portfolio_handle_signal_order_types(self):
         """
@@ -304,6 +318,20 @@ class TestBacktestingFramework(unittest.TestCase):
         except Exception as e:
             self.fail(f"plot_signals raised an exception: {e}")
 
+        # generate_signals codes plot the same markers, one collection per signal type
+        plot_signals(df, np.array([0, 1, 0, -1, 0], dtype=np.int8))
+        buys, sells = plt.gca().collections
+        self.assertEqual(buys.get_offsets()[:, 1].tolist(), [152])
+        self.assertEqual(sells.get_offsets()[:, 1].tolist(), [155])
+        plt.close('all')
+
+        # Signal pairs, as generate_signal returns them, plot like the string labels
+        plot_signals(df, [(1, Signal.BUY), (3, Signal.SELL)])
+        buys, sells = plt.gca().collections
+        self.assertEqual(buys.get_offsets()[:, 1].tolist(), [152])
+        self.assertEqual(sells.get_offsets()[:, 1].tolist(), [155])
+        plt.close('all')
+
     @patch('matplotlib.pyplot.show')
     def test_plot_portfolio_visual(self, mock_show):
         """
@@ -386,6 +414,597 @@ class TestBacktestingFramework(unittest.TestCase):
         except Exception as e:
             self.fail(f"plot_all_strategies_results raised an exception: {e}")
 
+        # Headless: every figure is written to disk and released
+        import tempfile, os
+        mock_show.reset_mock()
+        with tempfile.TemporaryDirectory() as save_dir:
+            plot_all_strategies_results(portfolios, tickers, save_dir=save_dir)
+            self.assertEqual(len(os.listdir(save_dir)), len(portfolios) * (len(tickers) + 1))
+        self.assertFalse(mock_show.called)
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_rolling_kernels_match_pandas(self):
+        """
+        Test the Numba rolling mean/std kernels against pandas rolling().
+        """
+        from backtest._kernels import _rolling_sma, _rolling_std_welford, _returns_and_vol
+        values = np.cumsum(np.random.normal(size=500)) + 100
+        values[[0, 50]] = np.nan # NaN windows must stay NaN, as in pandas
+        out = np.empty_like(values)
+        for window in (5, 20):
+            _rolling_sma(values, window, out)
+            np.testing.assert_allclose(out, pd.Series(values).rolling(window).mean().to_numpy(), equal_nan=True)
+            _rolling_std_welford(values, window, out)
+            np.testing.assert_allclose(out, pd.Series(values).rolling(window).std().to_numpy(), equal_nan=True, atol=1e-9)
+
+        prices = np.array([10, 11, 0, 12, 13, 12.5, 14, 15, 14, 16], dtype=np.float64) # 0 -> inf return
+        returns, vol = np.empty_like(prices), np.empty_like(prices)
+        _returns_and_vol(prices, 3, returns, vol)
+        np.testing.assert_allclose(returns, pd.Series(prices).pct_change().to_numpy(), equal_nan=True)
+        np.testing.assert_allclose(vol, pd.Series(prices).pct_change().rolling(3).std().to_numpy(), equal_nan=True)
+
+    def test_fill_missing_matches_pandas(self):
+        """
+        Test that the Numba forward/backward fill matches pandas ffill().bfill().
+        """
+        df = pd.DataFrame({
+            'open': np.array([np.nan, 1.0, np.nan, 3.0], dtype=np.float32),
+            'close': [np.nan, np.nan, 2.0, np.nan],
+            'volume': np.array([1, 2, 3, 4], dtype=np.int64),
+        })
+        expected = df.ffill().bfill()
+        self.assertFalse(self.data_loader._fill_missing(df))
+        pd.testing.assert_frame_equal(df, expected)
+        self.assertTrue(self.data_loader._fill_missing(pd.DataFrame({'close': [np.nan, np.nan]})))
+
+    def test_latest_price_from_numpy_matrix(self):
+        """
+        Test that get_latest_price reads the close column of a matrix stored without datetime.
+        """
+        matrix = np.arange(2 * 15, dtype=np.float32).reshape(2, 15)
+        self.data_loader.data['MAT'] = matrix
+        self.assertEqual(self.data_loader.get_latest_price('MAT'), matrix[-1, 3])
+
+    def test_price_history_frame_and_soa(self):
+        """
+        Test that get_price_history keeps returning the DataFrame while get_price_history_soa returns the SoA views.
+        """
+        loader = DataLoader()
+        df = pd.DataFrame({'datetime': pd.date_range('2024-01-01', periods=10, freq='5min'), 'close': np.arange(10.0)})
+        loader._store('SYN', df, return_numpy=False)
+        history = loader.get_price_history('SYN', lookback=3)
+        self.assertIsInstance(history, pd.DataFrame)
+        self.assertEqual(history['close'].tolist(), [7.0, 8.0, 9.0])
+        soa = loader.get_price_history_soa('SYN', lookback=3)
+        self.assertEqual(soa.close.tolist(), [7.0, 8.0, 9.0])
+        self.assertIsNone(loader.get_price_history_soa('MISSING'))
+
+    def test_load_all_matches_load_ticker(self):
+        """
+        Test that loading tickers through the process pool gives the same frames as load_ticker.
+        """
+        import tempfile, os
+        with tempfile.TemporaryDirectory() as tmp:
+            tickers = {}
+            for symbol in ['AAA', 'BBB']:
+                path = os.path.join(tmp, f'{symbol}.csv')
+                pd.DataFrame({
+                    'datetime': pd.date_range('2024-01-01', periods=60, freq='5min'),
+                    'open': np.random.rand(60) + 10, 'high': np.random.rand(60) + 11,
+                    'low': np.random.rand(60) + 9, 'close': np.random.rand(60) + 10,
+                    'volume': np.random.randint(100, 1000, 60),
+                }).to_csv(path, sep=';', index=False)
+                tickers[symbol] = [path]
+
+            loader = DataLoader(cache_dir=None)
+            loader.load_all(tickers)
+            for symbol, paths in tickers.items():
+                single = DataLoader(cache_dir=None)
+                single.load_ticker(symbol, paths)
+                pd.testing.assert_frame_equal(loader.data[symbol], single.data[symbol])
+                self.assertIn(symbol, loader.soa)
+
+    def test_as_soa_aligns_on_shared_datetimes(self):
+        """
+        Test that as_soa stacks tickers into (T, K) matrices on the intersected datetimes, like an inner concat.
+        """
+        from backtest import TickerSOA
+        loader = DataLoader(cache_dir=None)
+        frames = {}
+        for symbol, start in [('AAA', '2024-01-01 00:00'), ('BBB', '2024-01-01 01:00')]:
+            frames[symbol] = pd.DataFrame({
+                'datetime': pd.date_range(start, periods=50, freq='5min'),
+                'open': np.random.rand(50), 'high': np.random.rand(50), 'low': np.random.rand(50),
+                'close': np.random.rand(50), 'volume': np.random.randint(100, 1000, 50),
+            })
+            loader.soa[symbol] = TickerSOA.from_dataframe(frames[symbol].sample(frac=1, random_state=0)) # Unsorted rows
+
+        soa = loader.as_soa()
+        expected = pd.concat({s: df.set_index('datetime')['close'] for s, df in frames.items()}, axis=1, join='inner')
+        self.assertEqual(soa.symbols, ('AAA', 'BBB'))
+        self.assertEqual(soa.close.shape, (38, 2))
+        self.assertTrue(soa.close.flags['C_CONTIGUOUS'])
+        self.assertTrue((soa.index == expected.index).all())
+        np.testing.assert_allclose(soa.close, expected.to_numpy(dtype=np.float32))
+        self.assertEqual(loader.as_soa(['BBB']).close.shape, (50, 1))
+
+    def test_engine_single_ticker_bar_loop(self):
+        """
+        Test the per-bar loop in-process on synthetic data: strategies read the current bar from the column arrays.
+        """
+        n = 300
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'open': 100.0, 'high': 101.0, 'low': 99.0,
+            'close': 100 + np.cumsum(np.random.normal(0, 1, n)),
+            'volume': np.arange(n),
+        })
+        self.data_loader.data['SYN'] = self.data_loader.get_features(df)
+        portfolio = Portfolio(initial_cash=100000)
+        portfolio.set_data_loader(self.data_loader)
+        engine = Engine(self.data_loader, portfolio, SimpleMovingAverageStrategy())
+        engine._run_backtest_single_ticker('SYN')
+        self.assertGreater(len(portfolio.trade_log), 0)
+
+    def test_sma_custom_windows_running_means(self):
+        """
+        Test that SMA windows without precomputed columns use running means matching pandas, per bar and vectorised.
+        """
+        close = 100 + np.cumsum(np.random.normal(0, 1, 200))
+        strategy = SimpleMovingAverageStrategy(short_window=3, long_window=10)
+        means = np.array([strategy._update_running_means(value) for value in close])
+        np.testing.assert_allclose(means[:, 0], pd.Series(close).rolling(3).mean(), rtol=1e-9)
+        np.testing.assert_allclose(means[:, 1], pd.Series(close).rolling(10).mean(), rtol=1e-9)
+
+        columns = {'close': close}
+        bar = SimpleMovingAverageStrategy(short_window=3, long_window=10)
+        per_bar = [bar.generate_signal('SYN', {'close': value, 'idx': idx, 'columns': columns}) for idx, value in enumerate(close)]
+        vectorised = SimpleMovingAverageStrategy(short_window=3, long_window=10)
+        # Split in two runs to check the running state carries over between calls
+        signals = np.concatenate([vectorised.generate_signals({'close': close[:50]}), vectorised.generate_signals({'close': close[50:]})])
+        self.assertEqual(per_bar, [Signal(code) if code else None for code in signals])
+        self.assertAlmostEqual(vectorised.previous_long_ma, bar.previous_long_ma)
+
+    def test_sma_crossover_grid_matches_strategies(self):
+        """
+        Test that the window-pair grid scan gives each pair the signals of its own SimpleMovingAverageStrategy.
+        """
+        from backtest import sma_crossover_grid
+        close = 100 + np.cumsum(np.random.normal(0, 1, 2000))
+        pairs = [(short, long) for short in (3, 5, 8) for long in (10, 20)]
+        for max_workers in (1, 4):
+            grid = sma_crossover_grid(close, pairs, max_workers=max_workers)
+            for row, (short, long) in zip(grid, pairs):
+                np.testing.assert_array_equal(row, SimpleMovingAverageStrategy(short, long).generate_signals({'close': close}))
+
+    def test_close_history_window(self):
+        """
+        Test that per-bar strategies receive a read-only close window bounded by required_lookback.
+        """
+        from backtest import Strategy
+
+        class WindowStrategy(Strategy):
+            required_lookback = 5
+
+            def __init__(self):
+                super().__init__()
+                self.windows = []
+
+            def generate_signal(self, ticker, market_data):
+                self.windows.append(market_data['close_history'])
+                return None
+
+        n = 50
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'open': 100.0, 'high': 101.0, 'low': 99.0,
+            'close': 100 + np.arange(n, dtype=float),
+            'volume': np.arange(n),
+        })
+        self.data_loader.data['SYN'] = self.data_loader.get_features(df)
+        strategy = WindowStrategy()
+        Engine(self.data_loader, Portfolio(initial_cash=100000), strategy)._run_backtest_single_ticker('SYN')
+        close = self.data_loader.data['SYN']['close'].to_numpy(dtype=np.float64)
+        self.assertEqual([len(window) for window in strategy.windows[:6]], [1, 2, 3, 4, 5, 5])
+        np.testing.assert_array_equal(strategy.windows[-1], close[-5:])
+        self.assertFalse(strategy.windows[-1].flags.writeable)
+
+    def test_compiled_order_loop_matches_bar_loop(self):
+        """
+        Test that the vectorised signals + compiled order loop give the same trades as the per-bar Python loop,
+        as do the vectorised signals replayed through the bar loop (taken when orders are pending).
+        """
+        n = 1000
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'open': 100.0, 'high': 101.0, 'low': 99.0,
+            'close': 100 + np.cumsum(np.random.normal(0, 1, n)),
+            'volume': np.arange(n),
+        })
+        self.data_loader.data['SYN'] = self.data_loader.get_features(df)
+        for strategy_cls in [SimpleMovingAverageStrategy, RSIStrategy, MACDStrategy, BollingerBandsStrategy]:
+            results = []
+            for mode in ('compiled', 'bar', 'signals'):
+                strategy = strategy_cls()
+                if mode == 'bar':
+                    strategy.generate_signals = lambda columns: None # Force the bar-by-bar path
+                portfolio = Portfolio(initial_cash=5000, slippage_rate=0.0)
+                if mode == 'signals':
+                    portfolio.pending_orders = [Order(OrderType.LIMIT, 'OTHER', 10, price=1.0)] # Never priced, stays pending
+                Engine(self.data_loader, portfolio, strategy)._run_backtest_single_ticker('SYN')
+                results.append(([tuple(map(str, trade)) for trade in portfolio.trade_log], portfolio.cash))
+            for trades, cash in results[1:]:
+                self.assertEqual(results[0][0], trades, strategy_cls.__name__)
+                self.assertAlmostEqual(results[0][1], cash)
+
+    def test_compiled_orders_match_handle_signal_with_slippage(self):
+        """
+        Test that a seeded handle_signal_array draws slippage exactly as successive handle_signal calls do:
+        sells with nothing held take no draw, and draws spanning a buffer refill stay in sequence.
+        """
+        rng = np.random.default_rng(11)
+        cases = [np.array([-1, 1, 0, -1, 1, 1, -1, -1], dtype=np.int8),
+                 rng.choice(np.array([1, -1, -1, 0], dtype=np.int8), 6000)]
+        for signals in cases:
+            close = 100 + np.arange(len(signals)) * 0.01
+            sequential = Portfolio(initial_cash=100000, slippage_rate=0.01, seed=7)
+            sequential._slippage_draws(4090) # Start near the end of a buffered block
+            for i in np.flatnonzero(signals):
+                sequential.handle_signal('SYN', int(signals[i]), current_price=close[i], index=i)
+            compiled = Portfolio(initial_cash=100000, slippage_rate=0.01, seed=7)
+            compiled._slippage_draws(4090)
+            compiled.handle_signal_array('SYN', close, signals)
+            self.assertEqual([tuple(map(str, trade)) for trade in compiled.trade_log], [tuple(map(str, trade)) for trade in sequential.trade_log])
+            self.assertAlmostEqual(compiled.cash, sequential.cash)
+            self.assertEqual(compiled._slippage_draws(1), sequential._slippage_draws(1)) # Same stream position afterwards
+
+    def test_refused_orders_keep_slippage_in_step(self):
+        """
+        Test that when the drawdown limit refuses every order, the compiled paths still use the draws handle_signal would.
+        """
+        signals = np.array([-1, 1, 0, -1, 1], dtype=np.int8)
+        close = np.full(len(signals), 100.0)
+        portfolios = []
+        for _ in range(3):
+            portfolio = Portfolio(initial_cash=100000, slippage_rate=0.01, max_drawdown=0.1, seed=7)
+            portfolio.execute_trade('HELD', 10, 100, -1)
+            portfolio.history = [{'timestamp': pd.Timestamp('2024-01-01'), 'portfolio_value': 100000},
+                                 {'timestamp': pd.Timestamp('2024-01-02'), 'portfolio_value': 50000}]
+            portfolios.append(portfolio)
+        sequential, compiled, batch = portfolios
+        for ticker in ['SYN', 'HELD']:
+            for i in np.flatnonzero(signals):
+                sequential.handle_signal(ticker, int(signals[i]), current_price=close[i], index=i)
+            compiled.handle_signal_array(ticker, close, signals)
+        batch.handle_signal_batch(['SYN'] * len(signals) + ['HELD'] * len(signals), np.tile(signals, 2), np.tile(close, 2), np.arange(2 * len(signals)))
+        self.assertEqual(sequential.trade_log[1:], [])
+        expected = sequential._slippage_draws(1)
+        self.assertEqual(compiled._slippage_draws(1), expected)
+        self.assertEqual(batch._slippage_draws(1), expected)
+
+    def test_signal_batch_matches_handle_signal(self):
+        """
+        Test that handle_signal_batch executes interleaved multi-ticker signals like successive handle_signal calls.
+        """
+        rng = np.random.default_rng(3)
+        n = 400
+        tickers = rng.choice(['AMD', 'NVDA', 'AAPL'], n)
+        signals = rng.choice(np.array([1, -1, 0], dtype=np.int8), n)
+        prices = rng.uniform(50, 150, n)
+        indices = np.arange(n)
+
+        # Seeded slippage: sells of unheld tickers must not use up a draw in the batch either
+        for slippage_rate in (0.0, 0.01):
+            with self.subTest(slippage_rate=slippage_rate):
+                sequential = Portfolio(initial_cash=20000, slippage_rate=slippage_rate, volatility_threshold=0.5, seed=7)
+                sequential.execute_trade('AMD', 10, 100, -1) # Start with an existing position
+                batch = Portfolio(initial_cash=20000, slippage_rate=slippage_rate, volatility_threshold=0.5, seed=7)
+                batch.execute_trade('AMD', 10, 100, -1)
+                for ticker, signal, price, index in zip(tickers, signals, prices, indices):
+                    if signal:
+                        sequential.handle_signal(ticker, 'BUY' if signal > 0 else 'SELL', current_price=price, index=index)
+                batch.handle_signal_batch(tickers, signals, prices, indices)
+
+                self.assertEqual([tuple(map(str, trade)) for trade in batch.trade_log], [tuple(map(str, trade)) for trade in sequential.trade_log])
+                self.assertAlmostEqual(batch.cash, sequential.cash)
+                self.assertEqual({t: (p.quantity, round(p.entry_price, 9)) for t, p in batch.positions.items()},
+                                 {t: (p.quantity, round(p.entry_price, 9)) for t, p in sequential.positions.items()})
+
+    def test_signal_matrix_matches_handle_signal(self):
+        """
+        Test that handle_signal_matrix walks a (T, K) signal matrix bar by bar, ticker by ticker, like handle_signal.
+        """
+        rng = np.random.default_rng(5)
+        tickers = ['AMD', 'NVDA', 'AAPL']
+        close = rng.uniform(50, 150, (300, len(tickers)))
+        signals = rng.choice(np.array([1, -1, 0], dtype=np.int8), close.shape)
+
+        for slippage_rate in (0.0, 0.01):
+            with self.subTest(slippage_rate=slippage_rate):
+                sequential = Portfolio(initial_cash=20000, slippage_rate=slippage_rate, volatility_threshold=0.5, seed=7)
+                for i in range(close.shape[0]):
+                    for k, ticker in enumerate(tickers):
+                        if signals[i, k]:
+                            sequential.handle_signal(ticker, 'BUY' if signals[i, k] > 0 else 'SELL', current_price=close[i, k], index=i)
+                matrix = Portfolio(initial_cash=20000, slippage_rate=slippage_rate, volatility_threshold=0.5, seed=7)
+                matrix.handle_signal_matrix(tickers, close, signals)
+
+                self.assertEqual([tuple(map(str, trade)) for trade in matrix.trade_log], [tuple(map(str, trade)) for trade in sequential.trade_log])
+                self.assertAlmostEqual(matrix.cash, sequential.cash)
+        with self.assertRaises(ValueError):
+            matrix.handle_signal_matrix(tickers[:2], close, signals)
+
+    def test_run_backtest_merges_worker_trades(self):
+        """
+        Test that trades made on the worker threads (vectorised path) or processes reach the parent portfolio.
+        """
+        n = 500
+        for ticker in ['SYN1', 'SYN2']:
+            df = pd.DataFrame({
+                'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+                'open': 100.0, 'high': 101.0, 'low': 99.0,
+                'close': 100 + np.cumsum(np.random.normal(0, 1, n)),
+                'volume': np.arange(n),
+            })
+            self.data_loader.data[ticker] = self.data_loader.get_features(df)
+
+        # Each worker trades against half of the portfolio's cash, like a single-ticker run with that balance
+        expected_trades, expected_cash = [], 0.0
+        for ticker in ['SYN1', 'SYN2']:
+            portfolio = Portfolio(initial_cash=50000, slippage_rate=0.0)
+            Engine(self.data_loader, portfolio, SimpleMovingAverageStrategy())._run_backtest_single_ticker(ticker)
+            expected_trades += portfolio.trade_log
+            expected_cash += portfolio.cash - 50000
+
+        for vectorised in (True, False):
+            with self.subTest(vectorised=vectorised), patch.object(Engine, '_runs_vectorised', return_value=vectorised):
+                portfolio = Portfolio(initial_cash=100000, slippage_rate=0.0)
+                Engine(self.data_loader, portfolio, SimpleMovingAverageStrategy()).run_backtest(['SYN1', 'SYN2'])
+                self.assertEqual(portfolio.trade_log, expected_trades)
+                self.assertAlmostEqual(portfolio.cash, 100000 + expected_cash)
+                self.assertEqual(set(portfolio.positions), {trade[0] for trade in expected_trades})
+
+        # Worker threads get their own strategy state, not containers shared through a shallow copy
+        import sys
+        engine_module = sys.modules['backtest.Engine']
+        seen = []
+        def record(ticker, columns, strategy, portfolio, signals=None):
+            seen.append(strategy)
+            return run_ticker(ticker, columns, strategy, portfolio, signals)
+        run_ticker = engine_module._run_ticker
+        strategy = SimpleMovingAverageStrategy()
+        with patch.object(engine_module, '_run_ticker', record):
+            Engine(self.data_loader, Portfolio(initial_cash=100000, slippage_rate=0.0), strategy).run_backtest(['SYN1', 'SYN2'])
+        self.assertEqual(len({id(s._closes) for s in seen + [strategy]}), 3)
+
+        # Worker tasks build their Engine without logging "Engine initialized." per ticker
+        columns = Engine(self.data_loader, Portfolio(), strategy)._get_ticker_columns('SYN1')
+        with patch.object(engine_module._default_logger, 'info') as info:
+            run_ticker('SYN1', columns, SimpleMovingAverageStrategy(), Portfolio())
+        self.assertNotIn("Engine initialized.", [call.args[0] for call in info.call_args_list])
+
+    def test_concurrent_runs_respect_cash(self):
+        """
+        Test that tickers run concurrently share the portfolio's cash instead of each spending all of it.
+        """
+        from backtest import run_strategies
+        for ticker in ['FLAT1', 'FLAT2']:
+            self.data_loader.data[ticker] = pd.DataFrame({
+                'datetime': pd.date_range('2024-01-01', periods=50, freq='5min'), 'close': 100.0})
+
+        for vectorised in (True, False):
+            with self.subTest(vectorised=vectorised), patch.object(Engine, '_runs_vectorised', return_value=vectorised):
+                portfolio = Portfolio(initial_cash=3000, slippage_rate=0.0)
+                Engine(self.data_loader, portfolio, AlwaysBuyStrategy()).run_backtest(['FLAT1', 'FLAT2'])
+                # 1500 each: one 10-share lot per ticker fits, a second does not
+                self.assertEqual(portfolio.cash, 1000.0)
+                self.assertEqual({t: p.quantity for t, p in portfolio.positions.items()}, {'FLAT1': 10, 'FLAT2': 10})
+
+                portfolio = Portfolio(initial_cash=3000, slippage_rate=0.0)
+                Engine(self.data_loader, portfolio, AlwaysBuyStrategy()).run_backtest(['FLAT1', 'FLAT2'], cash_per_ticker=500)
+                self.assertEqual((portfolio.cash, portfolio.positions), (3000, {})) # Too little per ticker for one lot
+                with self.assertRaises(ValueError):
+                    Engine(self.data_loader, Portfolio(initial_cash=3000), AlwaysBuyStrategy()).run_backtest(['FLAT1', 'FLAT2'], cash_per_ticker=1500.01)
+
+        for vectorised in (True, False):
+            with self.subTest(vectorised=vectorised), patch.object(Engine, '_runs_vectorised', return_value=vectorised):
+                (portfolio,) = run_strategies(self.data_loader, [AlwaysBuyStrategy()], ['FLAT1', 'FLAT2'], initial_cash=3000, slippage_rate=0.0)
+                self.assertEqual(portfolio.cash, 1000.0)
+
+    def test_run_strategies_matches_run_backtest(self):
+        """
+        Test that run_strategies gives each strategy the same trades and cash as its own Engine.run_backtest.
+        """
+        from backtest import run_strategies
+        n = 500
+        for ticker in ['SYN1', 'SYN2']:
+            df = pd.DataFrame({
+                'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+                'open': 100.0, 'high': 101.0, 'low': 99.0,
+                'close': 100 + np.cumsum(np.random.normal(0, 1, n)),
+                'volume': np.arange(n),
+            })
+            self.data_loader.data[ticker] = self.data_loader.get_features(df)
+
+        strategies = [SimpleMovingAverageStrategy(), SimpleMovingAverageStrategy(3, 10), RSIStrategy()]
+        expected = []
+        for strategy in strategies:
+            portfolio = Portfolio(initial_cash=100000, slippage_rate=0.0)
+            portfolio.set_data_loader(self.data_loader)
+            Engine(self.data_loader, portfolio, copy.copy(strategy)).run_backtest(['SYN1', 'SYN2', 'MISSING'])
+            expected.append((portfolio.trade_log, portfolio.cash))
+
+        vectorised = Engine._runs_vectorised
+        # Send the RSI strategy to the process pool to cover both executors
+        with patch.object(Engine, '_runs_vectorised', lambda engine: vectorised(engine) and not isinstance(engine.strategy, RSIStrategy)):
+            portfolios = run_strategies(self.data_loader, strategies, ['SYN1', 'SYN2', 'MISSING'], initial_cash=100000, slippage_rate=0.0)
+        for portfolio, (trades, cash) in zip(portfolios, expected):
+            self.assertEqual(portfolio.trade_log, trades)
+            self.assertAlmostEqual(portfolio.cash, cash)
+
+        # One worker per ticker and small tiles: the strategies share each ticker's columns tile by tile
+        with patch('backtest.Engine.os.cpu_count', return_value=1), patch('backtest.Engine._SIGNAL_TILE', 64):
+            portfolios = run_strategies(self.data_loader, strategies, ['SYN1', 'SYN2'], initial_cash=100000, slippage_rate=0.0)
+        for portfolio, (trades, cash) in zip(portfolios, expected):
+            self.assertEqual(portfolio.trade_log, trades)
+            self.assertAlmostEqual(portfolio.cash, cash)
+
+        # A strategy that stops producing signals after the first tile is reported, not written into the signal array
+        from backtest.Engine import _tiled_signals
+        class FirstTileOnly(SimpleMovingAverageStrategy):
+            calls = 0
+            def generate_signals(self, columns):
+                self.calls += 1
+                return super().generate_signals(columns) if self.calls == 1 else None
+        with self.assertRaises(ValueError):
+            _tiled_signals([FirstTileOnly()], {'close': np.random.rand(200)}, tile=64)
+
+    def test_history_arrays_grow(self):
+        """
+        Test that trade history recorded in the preallocated arrays survives growth and rebuilds the value series.
+        """
+        portfolio = Portfolio(initial_cash=100000, slippage_rate=0.0)
+        portfolio._reset_history(capacity=2)
+        for index in range(3):
+            self.assertTrue(portfolio.execute_trade('AMD', 10, 100 + index, index))
+        historical = portfolio.get_historical_value()
+        self.assertEqual(len(historical), 3)
+        self.assertEqual(list(historical['price']), [100, 101, 102])
+        self.assertEqual(historical['cash'].iloc[-1], portfolio.cash)
+        self.assertEqual(len(portfolio.portfolio_value_history), 3)
+        self.assertEqual(portfolio.history[0]['ticker'], 'AMD')
+        bar_time = np.datetime64('2024-01-02T09:30', 'ns')
+        portfolio.execute_trade('AMD', 10, 103, 3, timestamp=bar_time)
+        self.assertEqual(portfolio.portfolio_value_history.index[-1], pd.Timestamp(bar_time))
+
+    def test_final_metrics_memoised(self):
+        """
+        Test that final metrics are returned, reused while history is unchanged and recomputed after a new trade.
+        """
+        portfolio = Portfolio(initial_cash=100000, slippage_rate=0.0)
+        self.assertIsNone(portfolio.calculate_final_metrics())
+        for index, price in enumerate([100, 105, 98]):
+            portfolio.update_prices({'AMD': price})
+            portfolio.execute_trade('AMD', 10, price, index)
+        metrics = portfolio.calculate_final_metrics()
+        self.assertIn('sharpe_ratio', metrics)
+        self.assertIs(portfolio._return_metrics()[1], portfolio._return_metrics()[1])
+        portfolio.update_prices({'AMD': 110})
+        portfolio.execute_trade('AMD', 10, 110, 3)
+        self.assertNotEqual(portfolio.calculate_final_metrics()['annual_return'], metrics['annual_return'])
+
+    def test_slippage_draws_are_seeded(self):
+        """
+        Test that slippage comes from the seeded buffer: same seed, same execution prices, across buffer refills.
+        """
+        runs = []
+        for _ in range(2):
+            portfolio = Portfolio(initial_cash=10_000_000, slippage_rate=0.01, seed=7)
+            portfolio._SLIPPAGE_BLOCK = 3 # Force refills
+            for index in range(10):
+                portfolio.execute_trade('AMD', 10, 100.0, index)
+            runs.append(list(portfolio.trades_as_arrays()['execution_price']))
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(len(set(runs[0])), 10)
+        self.assertTrue(all(99.0 <= price <= 101.0 for price in runs[0]))
+
+    def test_total_value_matches_positions(self):
+        """
+        Test that the array-based total_value agrees with summing Position.market_value().
+        """
+        portfolio = Portfolio(initial_cash=100000, slippage_rate=0.0)
+        portfolio.execute_trade('AMD', 10, 100, 0)
+        portfolio.execute_trade('NVDA', 20, 50, 1)
+        portfolio.execute_trade('AMD', -10, 110, 2)
+        portfolio.update_prices({'NVDA': 55, 'MSFT': 300})
+        expected = portfolio.cash + sum(pos.market_value() for pos in portfolio.positions.values())
+        self.assertAlmostEqual(portfolio.total_value(), expected)
+        self.assertNotIn('AMD', portfolio.positions)
+        portfolio.update_prices({'NVDA': 0.0}) # A zero mark is a price, not a missing one
+        self.assertEqual(portfolio.positions['NVDA'].market_value(), 0.0)
+        self.assertAlmostEqual(portfolio.total_value(), portfolio.cash)
+
+    def test_trade_log_arrays_round_trip(self):
+        """
+        Test that the typed-array trade log round-trips tuples and exposes column arrays.
+        """
+        portfolio = Portfolio(initial_cash=100000)
+        trades = [('AMD', 'BUY', 10, 150.0, 150.5, 1), ('NVDA', 'BUY', 5, 400.0, 401.0, 2), ('AMD', 'SELL', 10, 160.0, 159.5, 3)]
+        portfolio.trade_log = trades
+        self.assertEqual(portfolio.trade_log, trades)
+        arrays = portfolio.trades_as_arrays()
+        self.assertEqual(list(arrays['ticker']), ['AMD', 'NVDA', 'AMD'])
+        self.assertEqual(list(arrays['side']), [1, 1, -1])
+        self.assertAlmostEqual(float((arrays['side'] * arrays['quantity'] * arrays['execution_price']).sum()), 10 * 150.5 + 5 * 401.0 - 10 * 159.5)
+
+    def test_cached_ta_matches_full_computation(self):
+        """
+        Test that cached TA-Lib results are reused for identical input and that a longer series sharing a
+        cached prefix gives exactly the full computation.
+        """
+        import talib
+        from backtest.DataLoader import _cached_ta
+        close = np.cumsum(np.random.normal(size=2000)) + 100
+        first = _cached_ta(close[:1500].copy(), talib.BBANDS, timeperiod=20)
+        self.assertIs(_cached_ta(close[:1500].copy(), talib.BBANDS, timeperiod=20), first)
+        extended = _cached_ta(close, talib.BBANDS, timeperiod=20)
+        for got, expected in zip(extended, talib.BBANDS(close, timeperiod=20)):
+            np.testing.assert_array_equal(got, expected)
+
+    def test_precompute_indicators_matches_features(self):
+        """
+        Test that precompute_indicators fills missing indicator columns exactly as get_features does, and that the Engine applies it.
+        """
+        from backtest.utils import precompute_indicators
+        n = 200
+        df = pd.DataFrame({
+            'datetime': pd.date_range('2024-01-01', periods=n, freq='5min'),
+            'open': 100.0, 'high': 101.0, 'low': 99.0,
+            'close': 100 + np.cumsum(np.random.normal(0, 1, n)),
+            'volume': np.arange(n),
+        })
+        features = self.data_loader.get_features(df)
+        self.assertEqual(list(df.columns), ['datetime', 'open', 'high', 'low', 'close', 'volume'])
+        self.assertIs(precompute_indicators(features, MACDStrategy().required_indicators), features)
+        specs = [('SMA', 5), ('SMA', 20), ('RSI', 14), ('MACD', 12, 26, 9), ('BB', 20, 2)]
+        filled = precompute_indicators(df, specs)
+        for col in ['SMA_5', 'SMA_20', 'RSI', 'MACD', 'MACD_Signal', 'BB_upper', 'BB_middle', 'BB_lower']:
+            np.testing.assert_array_equal(filled[col].to_numpy(), features[col].to_numpy())
+        self.assertNotIn('RSI', df.columns)
+
+        self.data_loader.data['RAW'] = df
+        engine = Engine(self.data_loader, Portfolio(initial_cash=100000), RSIStrategy())
+        self.assertIn('RSI', engine._get_ticker_columns('RAW'))
+
+    def test_ml_signals_match_per_bar(self):
+        """
+        Test that MLStrategy's one-shot predictions match its per-bar signals, NaN warm-up rows included.
+        """
+        from sklearn.linear_model import LogisticRegression
+        from backtest.Strategy import MLStrategy
+        rng = np.random.default_rng(3)
+        features = rng.normal(size=(120, 2))
+        model = LogisticRegression().fit(pd.DataFrame(features, columns=['f0', 'f1']), features[:, 0] + features[:, 1] > 0)
+        features[:5] = np.nan
+        columns = {'close': np.linspace(100, 110, 120), 'f0': features[:, 0], 'f1': features[:, 1]}
+        strategy = MLStrategy(model, ['f0', 'f1'])
+        signals = strategy.generate_signals(columns)
+        expected = [strategy.generate_signal('TEST', {'columns': columns, 'idx': i}) for i in range(120)]
+        self.assertEqual([Signal(code) if code else None for code in signals], expected)
+
+        # A model trained behind a scaler: the strategy applies the scaler's transform itself
+        from sklearn.preprocessing import StandardScaler, MinMaxScaler
+        raw = pd.DataFrame(rng.normal(50, 10, size=(120, 2)), columns=['f0', 'f1'])
+        for scaler in (StandardScaler().fit(raw), MinMaxScaler().fit(raw)):
+            scaled = pd.DataFrame(scaler.transform(raw), columns=['f0', 'f1'])
+            model = LogisticRegression().fit(scaled, scaled['f0'] > scaled['f1'])
+            strategy = MLStrategy(model, ['f0', 'f1'], scaler=scaler)
+            columns = {'close': np.linspace(100, 110, 120), 'f0': raw['f0'].to_numpy(), 'f1': raw['f1'].to_numpy()}
+            np.testing.assert_allclose(strategy._feature_frame(columns, 120).to_numpy(), scaled.to_numpy(), rtol=1e-5, atol=1e-5)
+            signals = strategy.generate_signals(columns)
+            expected = [strategy.generate_signal('TEST', {'columns': columns, 'idx': i}) for i in range(120)]
+            self.assertEqual([Signal(code) if code else None for code in signals], expected)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file